@@ -1,8 +1,233 @@
 import flet as ft
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import datetime
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
+# 気象庁APIへの接続を使い回すセッション（Keep-Alive・リトライ付き）
+TIMEOUT = (3.05, 10)  # 接続・読み込みタイムアウト（秒）
+session = requests.Session()
+session.mount("https://", HTTPAdapter(
+    pool_maxsize=16,
+    pool_block=True,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+))
+
+# 天気アイコンの保存先（一度取得したアイコンはassets/iconsから表示する）
+ICON_URL = "https://www.jma.go.jp/bosai/forecast/img"
+ICONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "icons")
+# アイコンの取得は画面の処理を待たせないよう別スレッドで行う
+icon_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="icons")
+_icons_pending = set()
+_icons_lock = threading.Lock()
+
+
+def download_icon(weather_code):
+    """天気コードのアイコンを気象庁から取得して保存（書きかけのファイルを表示しないよう一時ファイルから置き換える）"""
+    path = os.path.join(ICONS_DIR, f"{weather_code}.svg")
+    try:
+        if os.path.exists(path):
+            return
+        response = session.get(f"{ICON_URL}/{weather_code}.svg", timeout=TIMEOUT)
+        response.raise_for_status()
+        os.makedirs(ICONS_DIR, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(response.content)
+        os.replace(temp_path, path)
+    except Exception as e:
+        print(f"アイコン取得エラー: {e}")
+    finally:
+        with _icons_lock:
+            _icons_pending.discard(weather_code)
+
+
+def prefetch_icons(weather_codes):
+    """まだ保存していないアイコンを別スレッドで取得"""
+    for weather_code in weather_codes:
+        if os.path.exists(os.path.join(ICONS_DIR, f"{weather_code}.svg")):
+            continue
+        with _icons_lock:
+            if weather_code in _icons_pending:
+                continue
+            _icons_pending.add(weather_code)
+        icon_executor.submit(download_icon, weather_code)
+
+
+def weather_icon(weather_code):
+    """天気コードのアイコンのパス（保存済みならassets/icons、まだなら気象庁のURLを返し、裏で取得する）"""
+    if os.path.exists(os.path.join(ICONS_DIR, f"{weather_code}.svg")):
+        return f"/icons/{weather_code}.svg"
+    prefetch_icons([weather_code])
+    return f"{ICON_URL}/{weather_code}.svg"
+
+
+class ForecastCard:
+    """1日分の予報カード（一度だけ作成し、表示する値だけを書き換える）"""
+
+    def __init__(self):
+        self.date = ft.Text(size=16, weight=ft.FontWeight.BOLD)
+        self.icon = ft.Image(width=50, height=50)
+        self.weather = ft.Text(size=14)
+        self.temp_max = ft.Text(color="red", size=14)
+        self.temp_min = ft.Text(color="blue", size=14)
+        self.pop = ft.Text(size=14)
+        self.view = ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    self.date,
+                    self.icon,
+                    self.weather,
+                    ft.Row([
+                        self.temp_max,
+                        ft.Text(" "),
+                        self.temp_min,
+                    ], alignment=ft.MainAxisAlignment.CENTER),
+                    self.pop,
+                ], alignment=ft.MainAxisAlignment.CENTER),
+                padding=10,
+                bgcolor=ft.colors.WHITE,
+            ),
+            width=150,
+        )
+
+    def set(self, date_str, icon_src, weather, temp_max, temp_min, pop):
+        self.date.value = date_str
+        self.icon.src = icon_src
+        self.weather.value = weather
+        self.temp_max.value = f"最高 {temp_max}℃"
+        self.temp_min.value = f"最低 {temp_min}℃"
+        self.pop.value = f"降水確率: {pop}%"
+        self.view.visible = True
+
+
+class ForecastPanel:
+    """天気予報ダイアログ（セッションごとに一度だけ作成し、カードを使い回す）"""
+
+    def __init__(self, on_close):
+        self.title = ft.Text(size=20, weight=ft.FontWeight.BOLD)
+        self.message = ft.Text("天気情報を取得できませんでした。", visible=False)
+        self.cards = []
+        self.row = ft.Row([], scroll=ft.ScrollMode.AUTO, spacing=10)
+        self.body = ft.Container(
+            content=ft.Column([self.row]),
+            width=800,
+            height=300,
+        )
+        self.dialog = ft.AlertDialog(
+            title=self.title,
+            content=ft.Column([self.body, self.message], tight=True),
+            actions=[
+                ft.TextButton("閉じる", on_click=on_close)
+            ],
+        )
+
+    def show_forecast(self, area_name, days):
+        """days: (日付, アイコン, 天気, 最高気温, 最低気温, 降水確率) のリスト"""
+        self.title.value = area_name
+        # 足りない分だけカードを作り、余ったカードは隠す
+        while len(self.cards) < len(days):
+            card = ForecastCard()
+            self.cards.append(card)
+            self.row.controls.append(card.view)
+        for card, day in zip(self.cards, days):
+            card.set(*day)
+        for card in self.cards[len(days):]:
+            card.view.visible = False
+        self.body.visible = True
+        self.message.visible = False
+        self.dialog.open = True
+
+    def show_error(self):
+        self.title.value = "エラー"
+        self.body.visible = False
+        self.message.visible = True
+        self.dialog.open = True
+
+
+# 地方ごとの表示設定と府県（名前, 気象庁の地域コード）
+REGIONS = [
+    {
+        "title": "東北地方(北海道を含める)",
+        "subtitle": "北海道、青森、岩手、秋田、宮城、山形、福島",
+        "color": ft.colors.BLUE,
+        "areas": [
+            ("北海道", "011000"), ("青森県", "020000"), ("岩手県", "030000"),
+            ("秋田県", "050000"), ("宮城県", "040000"), ("山形県", "060000"),
+            ("福島県", "070000"),
+        ],
+    },
+    {
+        "title": "関東地方",
+        "subtitle": "茨城、栃木、群馬、埼玉、千葉、東京、神奈川",
+        "color": ft.colors.RED,
+        "areas": [
+            ("茨城県", "080000"), ("栃木県", "090000"), ("群馬県", "100000"),
+            ("山梨県", "190000"), ("長野県", "200000"), ("埼玉県", "110000"),
+            ("千葉県", "120000"), ("東京都", "130000"), ("神奈川県", "140000"),
+        ],
+    },
+    {
+        "title": "東海地方",
+        "subtitle": "静岡、岐阜、愛知、三重",
+        "color": ft.colors.LIGHT_BLUE,
+        "areas": [
+            ("静岡県", "220000"), ("岐阜県", "210000"), ("愛知県", "230000"),
+            ("三重県", "240000"),
+        ],
+    },
+    {
+        "title": "北陸地方",
+        "subtitle": "新潟、富山、石川、福井",
+        "color": ft.colors.GREEN,
+        "areas": [
+            ("新潟県", "150000"), ("富山県", "160000"), ("石川県", "170000"),
+            ("福井県", "180000"),
+        ],
+    },
+    {
+        "title": "近畿地方",
+        "subtitle": "滋賀、京都、奈良、和歌山、大阪、兵庫",
+        "color": ft.colors.YELLOW,
+        "areas": [
+            ("滋賀県", "250000"), ("京都府", "260000"), ("奈良県", "290000"),
+            ("和歌山県", "300000"), ("大阪県", "270000"), ("兵庫県", "280000"),
+        ],
+    },
+    {
+        "title": "中国地方",
+        "subtitle": "鳥取、島根、岡山、広島、山口",
+        "color": ft.colors.PINK,
+        "areas": [
+            ("鳥取県", "310000"), ("島根県", "320000"), ("岡山県", "330000"),
+            ("広島県", "340000"), ("山口県", "350000"),
+        ],
+    },
+    {
+        "title": "四国地方",
+        "subtitle": "徳島、香川、愛媛、高知",
+        "color": ft.colors.PURPLE,
+        "areas": [
+            ("徳島県", "360000"), ("香川県", "370000"), ("愛媛県", "380000"),
+            ("高知県", "390000"),
+        ],
+    },
+    {
+        "title": "九州地方(沖縄を含める)",
+        "subtitle": "福岡、佐賀、長崎、大分、熊本、宮崎、鹿児島、沖縄",
+        "color": ft.colors.LIGHT_GREEN,
+        "areas": [
+            ("福岡県", "400000"), ("佐賀県", "410000"), ("長崎県", "420000"),
+            ("大分県", "440000"), ("熊本県", "430000"), ("宮崎県", "450000"),
+            ("鹿児島県", "460100"), ("沖縄県", "471000"),
+        ],
+    },
+]
+
 def main(page: ft.Page):
     page.title = "天気予報アプリ"
     page.bgcolor = ft.colors.GREY_100
@@ -10,7 +235,7 @@ def main(page: ft.Page):
     def get_weather_info(area_code):
         url = f"https://www.jma.go.jp/bosai/forecast/data/forecast/{area_code}.json"
         try:
-            response = requests.get(url)
+            response = session.get(url, timeout=TIMEOUT)
             response.raise_for_status()
             data = response.json()
             return data[0]
@@ -19,8 +244,12 @@ def main(page: ft.Page):
             return None
         
     def close_dialog(e):
-        page.dialog.open = False
-        page.update()
+        panel.dialog.open = False
+        panel.dialog.update()
+
+    # ダイアログはセッションごとに一度だけ作成し、クリックごとに内容を書き換える
+    panel = ForecastPanel(on_close=close_dialog)
+    page.dialog = panel.dialog
     
     def show_weather_info(area_name, area_code):
         weather_data = get_weather_info(area_code)
@@ -37,8 +266,8 @@ def main(page: ft.Page):
             dates = [today + timedelta(days=i) for i in range(len(weathers))]
 
 
-            # 天気予報カードの生成
-            forecast_cards = []
+            # 天気予報カードの内容
+            days = []
             for i, (date, weather) in enumerate(zip(dates, weathers)):
                 date_str = f"{date.month}/{date.day}({['月','火','水','木','金','土','日'][date.weekday()]})"
                 
@@ -46,339 +275,46 @@ def main(page: ft.Page):
                 temp_min = temps[i*2] if i*2 < len(temps) and temps[i*2] != "" else "--"
 
                 pop = pops[i] if i < len(pops) else "--"
-                weather_icon_url = f"https://www.jma.go.jp/bosai/forecast/img/{weather_codes[i]}.svg"
-
-                forecast_cards.append(
-                ft.Card( 
-                    content=ft.Container(
-                        content=ft.Column([
-                            ft.Text(date_str, size=16, weight=ft.FontWeight.BOLD),
-                            ft.Image(
-                                src=weather_icon_url,
-                                width=50,
-                                height=50,
-                            ),
-                            ft.Text(weather, size=14),
-                            ft.Row([
-                                ft.Text(f"最高 {temp_max}℃", color="red", size=14),
-                                ft.Text(" "),
-                                ft.Text(f"最低 {temp_min}℃", color="blue", size=14),
-                            ], alignment=ft.MainAxisAlignment.CENTER),
-                            ft.Text(f"降水確率: {pop}%", size=14),
-                        ], alignment=ft.MainAxisAlignment.CENTER),
-                        padding=10,
-                        bgcolor=ft.colors.WHITE,
-                    ),
-                    width=150,
-                )
-            )
+                weather_icon_url = weather_icon(weather_codes[i])
 
-            page.dialog = ft.AlertDialog(
-                title=ft.Text(area_name, size=20, weight=ft.FontWeight.BOLD),
-                content=ft.Container(
-                    content=ft.Column([
-                        ft.Row(
-                            forecast_cards,
-                            scroll=ft.ScrollMode.AUTO,
-                            spacing=10,
-                        ),
-                    ]),
-                    width=800,
-                    height=300,
-                ),
-                actions=[
-                    ft.TextButton("閉じる", on_click=close_dialog)
-                ],
-            )
-            page.dialog.open = True
-            page.update()
+                days.append((date_str, weather_icon_url, weather, temp_max, temp_min, pop))
+
+            panel.show_forecast(area_name, days)
         else:
-            page.dialog = ft.AlertDialog(
-                title=ft.Text("エラー"),
-                content=ft.Text("天気情報を取得できませんでした。"),
-                actions=[
-                    ft.TextButton("閉じる", on_click=close_dialog)
-                ],
-            )
-            page.dialog.open = True
-            page.update()
+            panel.show_error()
+        panel.dialog.update()
+
+    def handle_area_click(e):
+        area_name, area_code = e.control.data
+        show_weather_info(area_name, area_code)
 
     def handle_expansion_tile_change(e):
+        # 府県のボタンは展開されたときに作成し、折りたたんだら破棄する
+        tile = e.control
         if e.data == 'true':
+            tile.controls = [
+                ft.ElevatedButton(text=area_name, data=(area_name, area_code), on_click=handle_area_click)
+                for area_name, area_code in tile.data["areas"]
+            ]
             message = "地域が展開されました"
         else:
+            tile.controls = []
             message = "地域が折りたたまれました"
+        tile.update()
         page.show_snack_bar(ft.SnackBar(content=ft.Text(message), duration=1000))
 
     content = [
         ft.ExpansionTile(
-            title=ft.Text("東北地方(北海道を含める)"),
-            subtitle=ft.Text("北海道、青森、岩手、秋田、宮城、山形、福島"),
+            title=ft.Text(region["title"]),
+            subtitle=ft.Text(region["subtitle"]),
             trailing=ft.Icon(ft.icons.ARROW_DROP_DOWN),
-            collapsed_text_color=ft.colors.BLUE,
-            text_color=ft.colors.BLUE,
+            collapsed_text_color=region["color"],
+            text_color=region["color"],
             on_change=handle_expansion_tile_change,
-            controls=[
-                ft.ElevatedButton(
-                    text="北海道",
-                    on_click=lambda _: show_weather_info("北海道", "011000"),
-                ),
-                ft.ElevatedButton(
-                    text="青森県",
-                    on_click=lambda _: show_weather_info("青森県", "020000"),
-                ),
-                ft.ElevatedButton(
-                    text="岩手県",
-                    on_click=lambda _: show_weather_info("岩手県", "030000"),
-                ),
-                ft.ElevatedButton(
-                    text="秋田県",
-                    on_click=lambda _: show_weather_info("秋田県", "050000"),
-                ),
-                ft.ElevatedButton(
-                    text="宮城県",
-                    on_click=lambda _: show_weather_info("宮城県", "040000"),
-                ),
-                ft.ElevatedButton(
-                    text="山形県",
-                    on_click=lambda _: show_weather_info("山形県", "060000"),
-                ),
-                ft.ElevatedButton(
-                    text="福島県",
-                    on_click=lambda _: show_weather_info("福島県", "070000"),
-                ),
-            ]
-        ),
-        ft.ExpansionTile(
-            title=ft.Text("関東地方"),
-            subtitle=ft.Text("茨城、栃木、群馬、埼玉、千葉、東京、神奈川"),
-            trailing=ft.Icon(ft.icons.ARROW_DROP_DOWN),
-            collapsed_text_color=ft.colors.RED,
-            text_color=ft.colors.RED,
-            on_change=handle_expansion_tile_change,
-            controls=[
-                ft.ElevatedButton(
-                    text="茨城県",
-                    on_click=lambda _: show_weather_info("茨城県", "080000"),
-                ),
-                ft.ElevatedButton(
-                    text="栃木県",
-                    on_click=lambda _: show_weather_info("栃木県", "090000"),
-                ),
-                ft.ElevatedButton(
-                    text="群馬県",
-                    on_click=lambda _: show_weather_info("群馬県", "100000"),
-                ),
-                ft.ElevatedButton(
-                    text="山梨県",
-                    on_click=lambda _: show_weather_info("山梨県", "190000"),
-                ),
-                ft.ElevatedButton(
-                    text="長野県",
-                    on_click=lambda _: show_weather_info("長野県", "200000"),
-                ),
-                ft.ElevatedButton(
-                    text="埼玉県",
-                    on_click=lambda _: show_weather_info("埼玉県", "110000"),
-                ), 
-                ft.ElevatedButton(
-                    text="千葉県",
-                    on_click=lambda _: show_weather_info("千葉県", "120000"),
-                ),  
-                ft.ElevatedButton(
-                    text="東京都",
-                    on_click=lambda _: show_weather_info("東京都", "130000"),
-                ),  
-                ft.ElevatedButton(
-                    text="神奈川県",
-                    on_click=lambda _: show_weather_info("神奈川県", "140000"),
-                ),   
-            ]
-        ),
-        ft.ExpansionTile(
-            title=ft.Text("東海地方"),
-            subtitle=ft.Text("静岡、岐阜、愛知、三重"),
-            trailing=ft.Icon(ft.icons.ARROW_DROP_DOWN),
-            collapsed_text_color=ft.colors.LIGHT_BLUE,
-            text_color=ft.colors.LIGHT_BLUE,
-            on_change=handle_expansion_tile_change,
-            controls=[
-                ft.ElevatedButton(
-                    text="静岡県",
-                    on_click=lambda _: show_weather_info("静岡県", "220000"),
-                ), 
-                ft.ElevatedButton(
-                    text="岐阜県",
-                    on_click=lambda _: show_weather_info("岐阜県", "210000"),
-                ),  
-                ft.ElevatedButton(
-                    text="愛知県",
-                    on_click=lambda _: show_weather_info("愛知県", "230000"),
-                ),  
-                ft.ElevatedButton(
-                    text="三重県",
-                    on_click=lambda _: show_weather_info("三重県", "240000"),
-                ),  
-            ]
-        ),
-        ft.ExpansionTile(
-            title=ft.Text("北陸地方"),
-            subtitle=ft.Text("新潟、富山、石川、福井"),
-            trailing=ft.Icon(ft.icons.ARROW_DROP_DOWN),
-            collapsed_text_color=ft.colors.GREEN,
-            text_color=ft.colors.GREEN,
-            on_change=handle_expansion_tile_change,
-            controls=[
-                ft.ElevatedButton(
-                    text="新潟県",
-                    on_click=lambda _: show_weather_info("新潟県", "150000"),
-                ),  
-                ft.ElevatedButton(
-                    text="富山県",
-                    on_click=lambda _: show_weather_info("富山県", "160000"),
-                ),  
-                ft.ElevatedButton(
-                    text="石川県",
-                    on_click=lambda _: show_weather_info("石川県", "170000"),
-                ),  
-                ft.ElevatedButton(
-                    text="福井県",
-                    on_click=lambda _: show_weather_info("福井県", "180000"),
-                ),  
-            ]
-        ),
-        ft.ExpansionTile(
-            title=ft.Text("近畿地方"),
-            subtitle=ft.Text("滋賀、京都、奈良、和歌山、大阪、兵庫"),
-            trailing=ft.Icon(ft.icons.ARROW_DROP_DOWN),
-            collapsed_text_color=ft.colors.YELLOW,
-            text_color=ft.colors.YELLOW,
-            on_change=handle_expansion_tile_change,
-            controls=[
-                ft.ElevatedButton(
-                    text="滋賀県",
-                    on_click=lambda _: show_weather_info("滋賀県", "250000"),
-                ),  
-                ft.ElevatedButton(
-                    text="京都府",
-                    on_click=lambda _: show_weather_info("京都府", "260000"),
-                ),  
-                ft.ElevatedButton(
-                    text="奈良県",
-                    on_click=lambda _: show_weather_info("奈良県", "290000"),
-                ),  
-                ft.ElevatedButton(
-                    text="和歌山県",
-                    on_click=lambda _: show_weather_info("和歌山県", "300000"),
-                ),  
-                ft.ElevatedButton(
-                    text="大阪県",
-                    on_click=lambda _: show_weather_info("大阪県", "270000"),
-                ),  
-                ft.ElevatedButton(
-                    text="兵庫県",
-                    on_click=lambda _: show_weather_info("兵庫県", "280000"),
-                ),  
-            ]
-        ),
-        ft.ExpansionTile(
-            title=ft.Text("中国地方"),
-            subtitle=ft.Text("鳥取、島根、岡山、広島、山口"),
-            trailing=ft.Icon(ft.icons.ARROW_DROP_DOWN),
-            collapsed_text_color=ft.colors.PINK,
-            text_color=ft.colors.PINK,
-            on_change=handle_expansion_tile_change,
-            controls=[
-                ft.ElevatedButton(
-                    text="鳥取県",
-                    on_click=lambda _: show_weather_info("鳥取県", "310000"),
-                ),  
-                ft.ElevatedButton(
-                    text="島根県",
-                    on_click=lambda _: show_weather_info("島根県", "320000"),
-                ),  
-                ft.ElevatedButton(
-                    text="岡山県",
-                    on_click=lambda _: show_weather_info("岡山県", "330000"),
-                ),  
-                ft.ElevatedButton(
-                    text="広島県",
-                    on_click=lambda _: show_weather_info("広島県", "340000"),
-                ),  
-                ft.ElevatedButton(
-                    text="山口県",
-                    on_click=lambda _: show_weather_info("山口県", "350000"),
-                ),  
-            ]
-        ),
-        ft.ExpansionTile(
-            title=ft.Text("四国地方"),
-            subtitle=ft.Text("徳島、香川、愛媛、高知"),
-            trailing=ft.Icon(ft.icons.ARROW_DROP_DOWN),
-            collapsed_text_color=ft.colors.PURPLE,
-            text_color=ft.colors.PURPLE,
-            on_change=handle_expansion_tile_change,
-            controls=[
-                ft.ElevatedButton(
-                    text="徳島県",
-                    on_click=lambda _: show_weather_info("徳島県", "360000"),
-                ),  
-                ft.ElevatedButton(
-                    text="香川県",
-                    on_click=lambda _: show_weather_info("香川県", "370000"),
-                ),  
-                ft.ElevatedButton(
-                    text="愛媛県",
-                    on_click=lambda _: show_weather_info("愛媛県", "380000"),
-                ),  
-                ft.ElevatedButton(
-                    text="高知県",
-                    on_click=lambda _: show_weather_info("高知県", "390000"),
-                ),  
-            ]
-        ),
-        ft.ExpansionTile(
-            title=ft.Text("九州地方(沖縄を含める)"),
-            subtitle=ft.Text("福岡、佐賀、長崎、大分、熊本、宮崎、鹿児島、沖縄"),
-            trailing=ft.Icon(ft.icons.ARROW_DROP_DOWN),
-            collapsed_text_color=ft.colors.LIGHT_GREEN,
-            text_color=ft.colors.LIGHT_GREEN,
-            on_change=handle_expansion_tile_change,
-            controls=[
-                ft.ElevatedButton(
-                    text="福岡県",
-                    on_click=lambda _: show_weather_info("福岡県", "400000"),
-                ),  
-                ft.ElevatedButton(
-                    text="佐賀県",
-                    on_click=lambda _: show_weather_info("佐賀県", "410000"),
-                ),  
-                ft.ElevatedButton(
-                    text="長崎県",
-                    on_click=lambda _: show_weather_info("長崎県", "420000"),
-                ),  
-                ft.ElevatedButton(
-                    text="大分県",
-                    on_click=lambda _: show_weather_info("大分県", "440000"),
-                ),  
-                ft.ElevatedButton(
-                    text="熊本県",
-                    on_click=lambda _: show_weather_info("熊本県", "430000"),
-                ),  
-                ft.ElevatedButton(
-                    text="宮崎県",
-                    on_click=lambda _: show_weather_info("宮崎県", "450000"),
-                ),  
-                ft.ElevatedButton(
-                    text="鹿児島県",
-                    on_click=lambda _: show_weather_info("鹿児島県", "460100"),
-                ),  
-                ft.ElevatedButton(
-                    text="沖縄県",
-                    on_click=lambda _: show_weather_info("沖縄県", "471000"),
-                ),  
-            ]
-        ),
+            data=region,
+            controls=[],
+        )
+        for region in REGIONS
     ]
 
 #スクロールができるようにする
@@ -388,4 +324,4 @@ def main(page: ft.Page):
             controls=content,
             )
         )
-ft.app(main)
+ft.app(main, assets_dir="assets")
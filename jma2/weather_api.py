@@ -1,7 +1,18 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 
+# 気象庁APIへの接続を使い回すセッション（Keep-Alive・リトライ付き）
+TIMEOUT = (3.05, 10)  # 接続・読み込みタイムアウト（秒）
+session = requests.Session()
+session.mount("https://", HTTPAdapter(
+    pool_maxsize=16,
+    pool_block=True,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504)),
+))
+
 class WeatherAPI:
     BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast"
 
@@ -10,7 +21,7 @@ class WeatherAPI:
         """気象庁APIから天気データを取得"""
         try:
             url = f"{WeatherAPI.BASE_URL}/{area_code}.json"
-            response = requests.get(url)
+            response = session.get(url, timeout=TIMEOUT)
             response.raise_for_status()
             return response.json()[0]
         except Exception as e:
@@ -0,0 +1,220 @@
+import bisect
+import hashlib
+import json
+import marshal
+import os
+import sys
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+AREAS_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "areas.json")
+
+# areas.jsonの階層（広い順）: 地方 → 府県予報区 → 一次細分区域 → 市町村等をまとめた地域 → 市町村
+LEVELS = ("centers", "offices", "class10s", "class15s", "class20s")
+
+# スナップショットの形式（変えたら上げる）
+SNAPSHOT_FORMAT = 1
+
+
+class AreaNode:
+    """areas.jsonの1地域"""
+    __slots__ = ("code", "name", "en_name", "kana", "level", "parent", "children")
+
+    def __init__(self, code: str, name: str, en_name: str, kana: Optional[str], level: int):
+        self.code = code
+        self.name = name
+        self.en_name = en_name
+        self.kana = kana
+        self.level = level
+        self.parent: Optional["AreaNode"] = None
+        self.children: Tuple["AreaNode", ...] = ()
+
+    @property
+    def level_name(self) -> str:
+        return LEVELS[self.level]
+
+    def ancestor(self, level: str) -> Optional["AreaNode"]:
+        """指定した階層の祖先（自分を含む）"""
+        target = LEVELS.index(level)
+        node = self
+        while node is not None and node.level > target:
+            node = node.parent
+        return node if node is not None and node.level == target else None
+
+    def descendants(self, level: str) -> Iterator["AreaNode"]:
+        """指定した階層の子孫を順に返す"""
+        target = LEVELS.index(level)
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.level == target:
+                yield node
+            elif node.level < target:
+                stack.extend(reversed(node.children))
+
+    def __repr__(self) -> str:
+        return f"AreaNode({self.level_name}, {self.code}, {self.name})"
+
+
+class AreaRegistry:
+    """areas.jsonを一度だけ読み込み、コード検索・階層移動・名前検索を提供"""
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                instance = super().__new__(cls)
+                instance._load(AREAS_JSON)
+                cls._instance = instance
+        return cls._instance
+
+    def _load(self, path: str):
+        """スナップショットがareas.jsonと一致すればそれを、なければJSONを読み込む"""
+        with open(path, "rb") as f:
+            source = f.read()
+        source_hash = hashlib.sha256(source).hexdigest()
+
+        snapshot = load_snapshot(snapshot_path(path), source_hash)
+        if snapshot is None:
+            snapshot = build_snapshot(source, source_hash)
+            save_snapshot(snapshot_path(path), snapshot)
+        self._build(snapshot["levels"], snapshot["search"])
+
+    def _build(self, levels: Tuple[tuple, ...], search: Tuple[tuple, ...]):
+        # 階層ごとに コード → 地域（府県予報区と一次細分区域で同じコードを持つことがある）
+        self._by_level: List[Dict[str, AreaNode]] = [
+            {
+                code: AreaNode(code, name, en_name, kana, level)
+                for code, name, en_name, kana, _, _ in rows
+            }
+            for level, rows in enumerate(levels)
+        ]
+
+        for level, rows in enumerate(levels):
+            nodes = self._by_level[level]
+            parents = self._by_level[level - 1] if level > 0 else {}
+            children = self._by_level[level + 1] if level + 1 < len(LEVELS) else {}
+            for code, _, _, _, parent, child_codes in rows:
+                node = nodes[code]
+                node.parent = parents.get(parent)
+                node.children = tuple(children[child] for child in child_codes if child in children)
+
+        # 名前・読みの前方一致検索用（ソート済みのキーと地域）
+        self._search_keys = [key for key, _, _ in search]
+        self._search_nodes = [self._by_level[level][code] for _, level, code in search]
+
+    def get(self, level: str, code: str) -> Optional[AreaNode]:
+        """階層とコードから地域を取得"""
+        return self._by_level[LEVELS.index(level)].get(code)
+
+    def find(self, code: str) -> Optional[AreaNode]:
+        """コードから地域を取得（同じコードが複数階層にある場合は広い方）"""
+        for nodes in self._by_level:
+            node = nodes.get(code)
+            if node is not None:
+                return node
+        return None
+
+    def nodes(self, level: str) -> List[AreaNode]:
+        """指定した階層の全地域（areas.jsonの順）"""
+        return list(self._by_level[LEVELS.index(level)].values())
+
+    def centers(self) -> List[AreaNode]:
+        return self.nodes("centers")
+
+    def offices(self) -> List[AreaNode]:
+        return self.nodes("offices")
+
+    def search(self, prefix: str, limit: int = 20) -> List[AreaNode]:
+        """名前または読み（ひらがな）の前方一致検索"""
+        results = []
+        seen = set()
+        start = bisect.bisect_left(self._search_keys, prefix)
+        for i in range(start, len(self._search_keys)):
+            if not self._search_keys[i].startswith(prefix) or len(results) >= limit:
+                break
+            node = self._search_nodes[i]
+            if id(node) not in seen:
+                seen.add(id(node))
+                results.append(node)
+        return results
+
+
+def snapshot_path(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".snapshot"
+
+
+def build_snapshot(source: bytes, source_hash: str) -> Dict[str, Any]:
+    """areas.jsonを階層ごとのタプルと整列済みの検索キーに変換"""
+    data = json.loads(source)
+    levels = []
+    search = []
+    for level, key in enumerate(LEVELS):
+        rows = []
+        for code, entry in data.get(key, {}).items():
+            # 同じ地域名は文字列を共有してメモリを節約
+            name = sys.intern(entry["name"])
+            kana = entry.get("kana")
+            rows.append((
+                code,
+                name,
+                entry.get("enName", ""),
+                kana,
+                entry.get("parent"),
+                tuple(entry.get("children", ())),
+            ))
+            search.append((name, level, code))
+            if kana:
+                search.append((kana, level, code))
+        levels.append(tuple(rows))
+    search.sort()
+    return {
+        "format": SNAPSHOT_FORMAT,
+        "python": sys.version_info[:2],
+        "source_hash": source_hash,
+        "levels": tuple(levels),
+        "search": tuple(search),
+    }
+
+
+def load_snapshot(path: str, source_hash: str) -> Optional[Dict[str, Any]]:
+    """スナップショットの読み込み（無い・壊れている・元のJSONと違う場合はNone）"""
+    try:
+        with open(path, "rb") as f:
+            snapshot = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if (
+        not isinstance(snapshot, dict)
+        or snapshot.get("format") != SNAPSHOT_FORMAT
+        or snapshot.get("python") != sys.version_info[:2]
+        or snapshot.get("source_hash") != source_hash
+    ):
+        return None
+    return snapshot
+
+
+def save_snapshot(path: str, snapshot: Dict[str, Any]) -> bool:
+    """スナップショットの書き込み（書き込めない環境では何もしない）"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(marshal.dumps(snapshot))
+        os.replace(temp_path, path)
+        return True
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["build"]:
+        with open(AREAS_JSON, "rb") as f:
+            source = f.read()
+        snapshot = build_snapshot(source, hashlib.sha256(source).hexdigest())
+        save_snapshot(snapshot_path(AREAS_JSON), snapshot)
+        print(f"作成しました: {snapshot_path(AREAS_JSON)}")
+    else:
+        print("使い方: python area_registry.py build")
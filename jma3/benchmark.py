@@ -0,0 +1,538 @@
+"""天気予報アプリの性能計測スクリプト
+
+使い方:
+    python benchmark.py http
+    python benchmark.py prefetch [--concurrency N]
+    python benchmark.py refresh [--refreshes N]
+    python benchmark.py snapshot [--rows N]
+    python benchmark.py areas
+    python benchmark.py coalesce [--sessions N] [--latency MS]
+    python benchmark.py parse [--corpus DIR] [--rounds N]
+    python benchmark.py records [--records N]
+    python benchmark.py pipeline [--corpus DIR] [--rounds N]
+    python benchmark.py sessions [--sessions N] [--rounds N]
+
+共通: --transport live | fixtures:DIR | stub:DIR | record:DIR （取得方法の切り替え）
+"""
+import argparse
+import asyncio
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import requests
+
+from http_client import HTTPClient
+from area_registry import AREAS_JSON, AreaRegistry, snapshot_path
+from forecast_cache import ForecastCache
+from forecast_parser import daily_forecasts, parse_forecast
+from forecast_records import FIELDS, ForecastBatch
+from forecast_store import ForecastStore
+from ingest import DEFAULT_CONCURRENCY, ingest_areas, load_office_areas, report
+from single_flight import SingleFlight
+from transports import FixtureTransport, RecordingTransport, StubServer
+from weather_api import WeatherAPI
+from weather_database import WeatherDatabase
+
+
+def _report(label: str, timings: List[float]):
+    """計測結果（秒）を表示"""
+    total = sum(timings)
+    print(
+        f"{label}: 合計 {total:.3f}s / 平均 {statistics.mean(timings) * 1000:.2f}ms"
+        f" / 中央値 {statistics.median(timings) * 1000:.2f}ms"
+        f" / 最大 {max(timings) * 1000:.2f}ms"
+    )
+
+
+def bench_http(args):
+    """全府県予報区の連続取得: 毎回requests.get vs 共有セッション（--transport stub:DIR ならローカルのサーバーに対して）"""
+    base_url = getattr(WeatherAPI.transport, "base_url", WeatherAPI.BASE_URL)
+    urls = [f"{base_url}/{code}.json" for _, code in load_office_areas()]
+
+    def run(get: Callable[[str], requests.Response]) -> List[float]:
+        timings = []
+        for url in urls:
+            start = time.perf_counter()
+            get(url).raise_for_status()
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    client = HTTPClient()
+    _report("requests.get（毎回接続）", run(lambda url: requests.get(url, timeout=client.timeout)))
+    _report("HTTPClient（Keep-Alive）", run(client.get))
+
+
+def bench_prefetch(args):
+    """起動直後（空のデータベース・キャッシュ）から全府県予報区のデータが揃うまでの時間"""
+    _use_temporary_database()
+    # 定時取得と同じ処理で計測する（開始をずらす待ち時間は除く）
+    report(asyncio.run(ingest_areas(load_office_areas(), args.concurrency, jitter=0)))
+
+
+def _use_temporary_database():
+    """計測用に空のweather.dbを一時ディレクトリに作る"""
+    os.chdir(tempfile.mkdtemp(prefix="jma-bench-"))
+    return WeatherDatabase()
+
+
+def bench_refresh(args):
+    """全府県予報区の3日分をN回更新した後のDBサイズと読み込み時間"""
+    db = _use_temporary_database()
+    rng = random.Random(0)
+    dates = ["2026-01-01", "2026-01-02", "2026-01-03"]
+    offices = load_office_areas()
+
+    start = time.perf_counter()
+    for i in range(args.refreshes):
+        name, code = offices[i % len(offices)]
+        db.save_weather_batch([
+            {
+                'area_code': code,
+                'area_name': name,
+                'region_code': code[:2],
+                'forecast_date': date,
+                'weather_code': rng.choice(["100", "101", "200", "300"]),
+                'weather_description': "晴れ",
+                'temperature_max': str(rng.randint(10, 30)),
+                'temperature_min': str(rng.randint(0, 10)),
+                'precipitation_probability': str(rng.randrange(0, 100, 10)),
+            }
+            for date in dates
+        ])
+    print(f"{args.refreshes}回の更新: {time.perf_counter() - start:.2f}s")
+
+    timings = []
+    for name, code in offices:
+        for date in dates:
+            start = time.perf_counter()
+            db.get_weather_forecast(code, date)
+            timings.append(time.perf_counter() - start)
+    _report("get_weather_forecast", timings)
+
+    conn = db._connect()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    for table in ("weather_forecasts", "temperatures", "precipitation_probabilities"):
+        print(f"{table}: {conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]}行")
+    print(f"DBサイズ: {os.path.getsize(db.db_name):,} bytes")
+
+
+def bench_snapshot(args):
+    """N行の予報を入れた状態で、正規化テーブルと非正規化テーブルの読み込みを比較"""
+    db = _use_temporary_database()
+    rng = random.Random(0)
+    area_count = 2000
+    days = max(args.rows // area_count, 3)
+    first_day = datetime.date(2026, 1, 1)
+    dates = [(first_day + datetime.timedelta(days=i)).isoformat() for i in range(days)]
+
+    start = time.perf_counter()
+    batch = []
+    for area in range(area_count):
+        code = f"{area:06d}"
+        for date in dates:
+            batch.append({
+                'area_code': code,
+                'area_name': f"地域{area}",
+                'region_code': code[:2],
+                'forecast_date': date,
+                'weather_code': rng.choice(["100", "101", "200", "300"]),
+                'weather_description': "晴れ",
+                'temperature_max': str(rng.randint(10, 30)),
+                'temperature_min': str(rng.randint(0, 10)),
+                'precipitation_probability': str(rng.randrange(0, 100, 10)),
+            })
+        if len(batch) >= 20000:
+            db.save_weather_batch(batch)
+            batch = []
+    db.save_weather_batch(batch)
+    print(f"{area_count * days:,}行の投入: {time.perf_counter() - start:.1f}s")
+
+    samples = [
+        (f"{rng.randrange(area_count):06d}", rng.randrange(days - 2))
+        for _ in range(2000)
+    ]
+    for use_snapshot, label in ((False, "正規化（5テーブル結合）"), (True, "forecast_snapshot")):
+        WeatherDatabase.USE_SNAPSHOT = use_snapshot
+        timings = []
+        for code, day in samples:
+            start = time.perf_counter()
+            db.get_forecast_range([code], dates[day], dates[day + 2])
+            timings.append(time.perf_counter() - start)
+        _report(label, timings)
+
+
+def bench_areas(args):
+    """areas.jsonの読み込み時間（JSON／スナップショット）と常駐メモリ"""
+    snapshot = snapshot_path(AREAS_JSON)
+    load = (
+        "import time; start = time.perf_counter(); "
+        "from area_registry import AreaRegistry; AreaRegistry(); "
+        "print(time.perf_counter() - start)"
+    )
+    for label, remove in (("JSONから読み込み", True), ("スナップショットから読み込み", False)):
+        timings = []
+        for _ in range(5):
+            if remove and os.path.exists(snapshot):
+                os.remove(snapshot)
+            result = subprocess.run(
+                [sys.executable, "-c", load],
+                cwd=os.path.dirname(AREAS_JSON), capture_output=True, text=True, check=True,
+            )
+            timings.append(float(result.stdout))
+        _report(f"起動時 {label}", timings)
+
+    AreaRegistry._instance = None
+    tracemalloc.start()
+    start = time.perf_counter()
+    registry = AreaRegistry()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"読み込み: {elapsed * 1000:.1f}ms / 常駐 {current / 1024:.0f}KiB / ピーク {peak / 1024:.0f}KiB")
+
+    timings = []
+    for node in registry.nodes("class20s"):
+        start = time.perf_counter()
+        registry.get("class20s", node.code).ancestor("offices")
+        timings.append(time.perf_counter() - start)
+    _report("コード検索＋府県予報区への移動", timings)
+
+    timings = []
+    for prefix in ("さ", "さっぽろ", "東京", "なか", "大"):
+        start = time.perf_counter()
+        registry.search(prefix)
+        timings.append(time.perf_counter() - start)
+    _report("前方一致検索", timings)
+
+
+def bench_coalesce(args):
+    """N個のセッションが同時に同じ地域を読み込んだときの上流への取得回数（SingleFlightでまとめる／まとめない）"""
+    _use_temporary_database()
+    area_code = "130000"
+    raw_data = WeatherAPI().fetch_weather_data(area_code)
+    if not raw_data:
+        print("天気データを取得できませんでした")
+        return
+
+    upstream_calls = 0
+    calls_lock = threading.Lock()
+
+    def fetch(area_code: str):
+        """取得したデータを一定の遅延で返す上流（呼び出し回数を数える）"""
+        nonlocal upstream_calls
+        with calls_lock:
+            upstream_calls += 1
+        time.sleep(args.latency / 1000)
+        return raw_data
+
+    flights = SingleFlight()
+    for label, call in (("まとめない", fetch), ("まとめる", lambda code: flights.do(code, fetch, code))):
+        upstream_calls = 0
+        barrier = threading.Barrier(args.sessions)
+        timings = []
+
+        def session():
+            barrier.wait()
+            start = time.perf_counter()
+            call(area_code)
+            timings.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=session) for _ in range(args.sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"{label}: {args.sessions}セッション → 上流への取得 {upstream_calls}回")
+        _report(f"{label} 応答時間", timings)
+
+    stats = flights.stats.snapshot()
+    print(
+        f"呼び出し {stats['calls']} / 実行 {stats['executions']} / 共有 {stats['shared']}"
+        f" （{stats['shared_ratio']:.1%}・最大同時待ち {stats['max_waiters']}）"
+    )
+
+
+def _load_corpus(corpus: str) -> List[tuple]:
+    """保存済みの気象庁レスポンスを読み込む（無ければ全府県予報区分を取得して記録）"""
+    recorder = RecordingTransport(corpus, WeatherAPI.transport)
+    documents = []
+    for name, code in load_office_areas():
+        path = os.path.join(corpus, f"{code}.json")
+        if not os.path.exists(path):
+            recorder.get(code).raise_for_status()
+        with open(path, encoding="utf-8") as f:
+            documents.append((code, name, json.load(f)))
+    return documents
+
+
+def bench_parse(args):
+    """保存済みレスポンス一式の解析（timeSeriesの列変換／日ごとの予報の作成）"""
+    documents = _load_corpus(args.corpus)
+    parse_timings = []
+    daily_timings = []
+    records = 0
+    for _ in range(args.rounds):
+        for code, name, data in documents:
+            start = time.perf_counter()
+            forecast = parse_forecast(data)
+            parsed_at = time.perf_counter()
+            records += len(daily_forecasts(forecast, code, name))
+            daily_timings.append(time.perf_counter() - parsed_at)
+            parse_timings.append(parsed_at - start)
+
+    print(f"{len(documents)}件のレスポンス × {args.rounds}回 → 日ごとの予報 {records // args.rounds}件/回")
+    _report("parse_forecast", parse_timings)
+    _report("daily_forecasts", daily_timings)
+    total = sum(parse_timings) + sum(daily_timings)
+    print(f"処理速度: {len(parse_timings) / total:,.0f}レスポンス/s")
+
+
+def bench_records(args):
+    """N件の予報の取り込み: 1日ごとの辞書 vs 項目ごとのリスト（ForecastBatch）"""
+    db = _use_temporary_database()
+    area_count = 2000
+    days = max(args.records // area_count, 1)
+    first_day = datetime.date(2026, 1, 1)
+    dates = [(first_day + datetime.timedelta(days=i)).isoformat() for i in range(days)]
+    report_datetime = "2026-01-01T05:00:00+09:00"
+
+    def values(offset: int):
+        # 比較が更新にならないよう、方式ごとに別の地域コードを使う
+        rng = random.Random(0)
+        for area in range(offset, offset + area_count):
+            code = f"{area:06d}"
+            for date in dates:
+                yield (
+                    code, f"地域{code}", code[:2], date,
+                    rng.choice(["100", "101", "200", "300"]), "晴れ",
+                    rng.randint(10, 30), rng.randint(0, 10), rng.randrange(0, 100, 10),
+                    report_datetime,
+                )
+
+    def as_dicts(offset: int):
+        return [dict(zip(FIELDS, row)) for row in values(offset)]
+
+    def as_batch(offset: int):
+        batch = ForecastBatch()
+        for row in values(offset):
+            batch.add(*row)
+        return batch
+
+    for offset, (label, build) in enumerate((("辞書のリスト", as_dicts), ("ForecastBatch", as_batch))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        data = build(offset * area_count)
+        built_at = time.perf_counter()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        db.save_weather_batch(data)
+        saved_at = time.perf_counter()
+        print(
+            f"{label}: {len(data):,}件 / 常駐 {current / 1024 / 1024:.1f}MiB"
+            f" / 作成 {built_at - start:.2f}s / 保存 {saved_at - built_at:.2f}s"
+            f" （{len(data) / (saved_at - start):,.0f}件/s）"
+        )
+        del data
+
+
+def bench_pipeline(args):
+    """保存済みレスポンスを使った 取得 → 整形 → 保存 の処理速度（ネットワーク不要・毎回同じ結果）"""
+    corpus = os.path.abspath(args.corpus)
+    _load_corpus(corpus)
+    offices = load_office_areas()
+    db = _use_temporary_database()
+    api = WeatherAPI()
+    cache = ForecastCache()
+
+    with StubServer(corpus) as server:
+        for label, transport in (("ファイル", FixtureTransport(corpus)), ("スタブサーバー", server.transport())):
+            WeatherAPI.use_transport(transport)
+            stages = {"取得": [], "整形": [], "保存": []}
+            digests = set()
+            records = 0
+            for _ in range(args.rounds):
+                # 毎回すべての地域を取得し直す
+                cache.clear(persistent=True)
+                batch = ForecastBatch()
+                for name, code in offices:
+                    start = time.perf_counter()
+                    raw_data = api.fetch_weather_data(code)
+                    fetched_at = time.perf_counter()
+                    batch.extend(api.process_weather_batch(raw_data, code, name))
+                    stages["取得"].append(fetched_at - start)
+                    stages["整形"].append(time.perf_counter() - fetched_at)
+                start = time.perf_counter()
+                db.save_weather_batch(batch)
+                stages["保存"].append(time.perf_counter() - start)
+                records += len(batch)
+                digests.add(hashlib.sha256(repr(list(batch.records())).encode()).hexdigest()[:12])
+
+            total = sum(sum(timings) for timings in stages.values())
+            print(
+                f"{label}: {len(offices)}地域 × {args.rounds}回 → {records:,}件"
+                f" （{records / total:,.0f}件/s・結果 {', '.join(sorted(digests))}）"
+            )
+            for stage, timings in stages.items():
+                _report(f"  {stage}", timings)
+
+
+class _SessionConnection:
+    """負荷計測用の画面との接続（送る命令は捨て、送った回数だけを数える）"""
+
+    def __init__(self):
+        from flet_core.pubsub import PubSubHub
+        self.pubsubhub = PubSubHub()
+        self.batches = 0
+        self._ids = itertools.count()
+        self._sent = threading.Condition()
+
+    def send_commands(self, session_id, commands):
+        from flet_core.protocol import PageCommandsBatchResponsePayload
+        # 追加した部品のIDだけを返す
+        results = [
+            " ".join(f"_{next(self._ids)}" for _ in command.commands)
+            for command in commands if command.name == "add"
+        ]
+        with self._sent:
+            self.batches += 1
+            self._sent.notify_all()
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+    def send_command(self, session_id, command):
+        from flet_core.protocol import PageCommandResponsePayload
+        return PageCommandResponsePayload(result="", error="")
+
+    def wait(self, batches: int, timeout: float = 10.0) -> bool:
+        with self._sent:
+            return self._sent.wait_for(lambda: self.batches >= batches, timeout)
+
+
+def _rss_mib() -> float:
+    """このプロセスの常駐メモリ（MiB）"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_sessions(args):
+    """N個のセッションを同じプロセスで開き、同時にクリックを繰り返したときの常駐メモリと応答時間"""
+    import flet as ft
+    from flet_core.page import Page
+    import main as app
+
+    store = ForecastStore()
+    if not any(store.get_many(code for _, code in load_office_areas()).values()):
+        print("予報が保存されていません（python ingest.py once で取得してください）")
+    loop = asyncio.new_event_loop()
+    base_rss = _rss_mib()
+
+    sessions = []
+    for i in range(args.sessions):
+        connection = _SessionConnection()
+        page = Page(connection, f"session-{i}", loop)
+        app.main(page)
+        targets = {"市町村の一覧": [], "府県予報区のボタン": []}
+        controls = [page]
+        while controls:
+            control = controls.pop()
+            if isinstance(control, ft.ListTile) and control.on_click:
+                targets["市町村の一覧"].append(control)
+            elif isinstance(control, ft.ElevatedButton):
+                targets["府県予報区のボタン"].append(control)
+            controls.extend(control._get_children())
+        sessions.append((connection, targets))
+    sessions_rss = _rss_mib()
+    print(
+        f"常駐メモリ: 開始時 {base_rss:.1f}MiB / {len(sessions)}セッション {sessions_rss:.1f}MiB"
+        f"（1セッションあたり {(sessions_rss - base_rss) * 1024 / max(len(sessions), 1):.0f}KiB）"
+    )
+
+    # 市町村の一覧は予報の表示のみ、府県予報区のボタンは市町村の一覧の作り直しも含む
+    for label in ("市町村の一覧", "府県予報区のボタン"):
+        timings = []
+        timings_lock = threading.Lock()
+        barrier = threading.Barrier(len(sessions))
+
+        def session(seed: int, connection: _SessionConnection, controls: list):
+            rng = random.Random(seed)
+            barrier.wait()
+            for _ in range(args.rounds):
+                # 読み込み中の表示と予報の表示の2回の送信で1クリック
+                expected = connection.batches + 2
+                start = time.perf_counter()
+                rng.choice(controls).on_click(None)
+                if connection.wait(expected):
+                    with timings_lock:
+                        timings.append(time.perf_counter() - start)
+
+        threads = [
+            threading.Thread(target=session, args=(i, connection, targets[label]))
+            for i, (connection, targets) in enumerate(sessions)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        timings.sort()
+        print(
+            f"{label}: {len(timings)}クリック（{len(timings) / elapsed:,.0f}回/s）"
+            f" / 応答 p50 {timings[len(timings) // 2] * 1000:.2f}ms"
+            f" / p95 {timings[int(len(timings) * 0.95)] * 1000:.2f}ms / 最大 {timings[-1] * 1000:.2f}ms"
+            f" / 常駐メモリ {_rss_mib():.1f}MiB"
+        )
+
+    stats = store.stats()
+    print(f"共有の予報: {stats['areas']}地域 {stats['forecasts']}件 / データベースからの読み込み {stats['loads']}回")
+
+BENCHMARKS: Dict[str, Callable] = {
+    "http": bench_http,
+    "prefetch": bench_prefetch,
+    "refresh": bench_refresh,
+    "snapshot": bench_snapshot,
+    "areas": bench_areas,
+    "coalesce": bench_coalesce,
+    "parse": bench_parse,
+    "records": bench_records,
+    "pipeline": bench_pipeline,
+    "sessions": bench_sessions,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("name", choices=sorted(BENCHMARKS))
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同時取得数")
+    parser.add_argument("--refreshes", type=int, default=10000, help="更新回数")
+    parser.add_argument("--sessions", type=int, default=100, help="同時セッション数")
+    parser.add_argument("--latency", type=int, default=200, help="上流の応答時間（ミリ秒）")
+    parser.add_argument("--corpus", default="corpus", help="保存済みレスポンスのディレクトリ")
+    parser.add_argument("--rounds", type=int, default=20, help="繰り返し回数")
+    parser.add_argument("--records", type=int, default=100000, help="取り込む予報の件数")
+    parser.add_argument("--transport", help="取得方法（live / fixtures:DIR / stub:DIR / record:DIR）")
+    parser.add_argument("--rows", type=int, default=1000000, help="予報の行数")
+    args = parser.parse_args()
+    if args.transport:
+        WeatherAPI.use_transport(args.transport)
+    BENCHMARKS[args.name](args)
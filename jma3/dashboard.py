@@ -0,0 +1,157 @@
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional
+
+import flet as ft
+
+from area_registry import AreaNode, AreaRegistry
+from forecast_events import events
+from forecast_panel import format_value
+from forecast_store import Forecasts, ForecastStore
+from icon_store import icon_src
+
+
+class ForecastTile:
+    """ダッシュボードの1地域分の小さな予報表示（一度だけ作成し、値だけを書き換える）"""
+    ICON_SIZE = 50
+
+    def __init__(self, office: AreaNode):
+        self.icon = ft.Image(width=self.ICON_SIZE, height=self.ICON_SIZE, visible=False)
+        self.description = ft.Text("データなし", size=12, max_lines=2)
+        self.temperature = ft.Text(size=12)
+        self.probability = ft.Text(size=12)
+        self.view = ft.Container(
+            content=ft.Column([
+                ft.Text(office.name, size=14, weight=ft.FontWeight.BOLD, max_lines=1),
+                ft.Row([
+                    self.icon,
+                    ft.Column([
+                        self.description,
+                        self.temperature,
+                        self.probability,
+                    ], spacing=2, expand=True),
+                ]),
+            ], spacing=4),
+            padding=10,
+            border_radius=8,
+            bgcolor=ft.colors.BLUE_50,
+        )
+
+    def set(self, forecast: Optional[Mapping[str, Any]]):
+        if forecast is None:
+            self.icon.visible = False
+            self.description.value = "データなし"
+            self.temperature.value = ""
+            self.probability.value = ""
+            return
+        self.icon.src = icon_src(forecast['weather_code'], self.ICON_SIZE)
+        self.icon.visible = True
+        self.description.value = forecast['weather_description']
+        self.temperature.value = (
+            f"{format_value(forecast['temperature_min'])}℃ / {format_value(forecast['temperature_max'])}℃"
+        )
+        self.probability.value = f"降水確率 {format_value(forecast['precipitation_probability'])}%"
+
+
+class Dashboard:
+    """地方（または全国）の府県予報区の今日の天気を並べて表示"""
+    # タイルの最大幅（px）
+    TILE_EXTENT = 220
+    ALL = "all"
+
+    def __init__(self, registry: AreaRegistry, store: ForecastStore):
+        self.registry = registry
+        self.store = store
+        self._tiles: Dict[str, ForecastTile] = {}
+        self._offices: List[AreaNode] = []
+        self._lock = threading.Lock()
+        # 表示中の地域の更新通知（startで購読を開始）
+        self._subscription = None
+
+        self.region = ft.Dropdown(
+            options=[ft.dropdown.Option(self.ALL, "全国")] + [
+                ft.dropdown.Option(center.code, center.name) for center in registry.centers()
+            ],
+            value=self.ALL,
+            width=260,
+            dense=True,
+            on_change=self._handle_region_change,
+        )
+        self.updated = ft.Text(size=12)
+        self.grid = ft.GridView(
+            max_extent=self.TILE_EXTENT,
+            child_aspect_ratio=1.6,
+            spacing=8,
+            run_spacing=8,
+            expand=True,
+        )
+        self.view = ft.Column([
+            ft.Row([
+                self.region,
+                ft.IconButton(icon=ft.icons.REFRESH, tooltip="読み込み直す", on_click=lambda e: self.refresh()),
+                self.updated,
+            ]),
+            self.grid,
+        ], expand=True)
+        self.select(self.ALL)
+
+    def select(self, center_code: str):
+        """表示する地方を切り替え（タイルは地域ごとに一度だけ作成）"""
+        if center_code == self.ALL:
+            offices = self.registry.offices()
+        else:
+            center = self.registry.get("centers", center_code)
+            offices = list(center.children) if center else []
+        with self._lock:
+            self._offices = offices
+            self.grid.controls = [self._tile(office).view for office in offices]
+            if self._subscription is not None:
+                self._subscription.set_codes(office.code for office in offices)
+
+    def _tile(self, office: AreaNode) -> ForecastTile:
+        tile = self._tiles.get(office.code)
+        if tile is None:
+            tile = self._tiles[office.code] = ForecastTile(office)
+        return tile
+
+    def refresh(self):
+        """表示中の全地域を1回のクエリで読み込み、画面への反映も1回にまとめる"""
+        with self._lock:
+            offices = self._offices
+            forecasts = self.store.get_many(office.code for office in offices)
+            for office in offices:
+                rows = forecasts.get(office.code)
+                self._tiles[office.code].set(rows[0] if rows else None)
+            self.updated.value = f"{datetime.now():%H:%M} 更新"
+        if self.view.page:
+            self.view.update()
+
+    def start(self):
+        """表示中の地域の更新通知の購読を開始（セッションごとに一度だけ）"""
+        with self._lock:
+            if self._subscription is None:
+                self._subscription = events.subscribe(
+                    self._apply, [office.code for office in self._offices]
+                )
+
+    def stop(self):
+        """購読をやめる（セッション終了時）"""
+        with self._lock:
+            if self._subscription is not None:
+                self._subscription.close()
+                self._subscription = None
+
+    def _apply(self, changed: Dict[str, Forecasts]):
+        """更新された地域のタイルだけを書き換え、画面への反映は1回にまとめる"""
+        with self._lock:
+            for code, rows in changed.items():
+                tile = self._tiles.get(code)
+                if tile is not None:
+                    tile.set(rows[0] if rows else None)
+            self.updated.value = f"{datetime.now():%H:%M} 更新"
+        if self.view.page:
+            self.view.update()
+
+    def _handle_region_change(self, e):
+        self.select(self.region.value)
+        self.refresh()
@@ -0,0 +1,204 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from forecast_records import ForecastBatch, ForecastData
+
+
+class ForecastArchive:
+    """発表ごとの予報履歴を月別のSQLiteファイルに追記保存するアーカイブ"""
+    _instance = None
+    _lock = threading.Lock()
+
+    ARCHIVE_DIR = "archive"
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                instance = super().__new__(cls)
+                instance.archive_dir = cls.ARCHIVE_DIR
+                instance._write_lock = threading.Lock()
+                os.makedirs(instance.archive_dir, exist_ok=True)
+                cls._instance = instance
+        return cls._instance
+
+    def _partition_path(self, month: str) -> str:
+        """月（YYYY-MM）ごとのファイルパス"""
+        return os.path.join(self.archive_dir, f"forecast_{month.replace('-', '')}.db")
+
+    @staticmethod
+    def _create_table(conn: sqlite3.Connection):
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS forecast_archive (
+            area_code TEXT NOT NULL,
+            forecast_date DATE NOT NULL,
+            report_datetime TEXT NOT NULL,
+            area_name TEXT,
+            weather_code TEXT,
+            weather_description TEXT,
+            temperature_max INTEGER,
+            temperature_min INTEGER,
+            precipitation_probability INTEGER,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (area_code, forecast_date, report_datetime)
+        ) WITHOUT ROWID
+        ''')
+
+    def append(self, weather_data: ForecastData) -> int:
+        """予報を追記（同じ発表時刻の予報は一度だけ保存）"""
+        batch = ForecastBatch.of(weather_data)
+        by_month: Dict[str, List[tuple]] = {}
+        for row in batch.rows(
+            'area_code', 'forecast_date', 'report_datetime', 'area_name',
+            'weather_code', 'weather_description',
+            'temperature_max', 'temperature_min', 'precipitation_probability'
+        ):
+            if not row[2]:
+                continue
+            by_month.setdefault(row[1][:7], []).append(row)
+
+        inserted = 0
+        with self._write_lock:
+            for month, rows in by_month.items():
+                if os.path.exists(self._partition_path(month) + ".gz"):
+                    print(f"圧縮済みの月には追記できません: {month}")
+                    continue
+                conn = sqlite3.connect(self._partition_path(month), timeout=30)
+                try:
+                    with conn:
+                        self._create_table(conn)
+                        before = conn.total_changes
+                        conn.executemany('''
+                        INSERT OR IGNORE INTO forecast_archive (
+                            area_code, forecast_date, report_datetime, area_name,
+                            weather_code, weather_description,
+                            temperature_max, temperature_min, precipitation_probability
+                        )
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ''', rows)
+                        inserted += conn.total_changes - before
+                except Exception as e:
+                    print(f"アーカイブ保存エラー: {e}")
+                finally:
+                    conn.close()
+        return inserted
+
+    def partitions(self) -> List[str]:
+        """保存済みの月（YYYY-MM）の一覧"""
+        months = set()
+        for name in os.listdir(self.archive_dir):
+            if name.startswith("forecast_") and (name.endswith(".db") or name.endswith(".db.gz")):
+                stamp = name[len("forecast_"):].split(".")[0]
+                months.add(f"{stamp[:4]}-{stamp[4:]}")
+        return sorted(months)
+
+    @contextmanager
+    def _open_partition(self, month: str) -> Iterator[Optional[sqlite3.Connection]]:
+        """読み込み用に月のファイルを開く（圧縮済みなら一時ファイルに展開）"""
+        path = self._partition_path(month)
+        temp_path = None
+        if not os.path.exists(path):
+            if not os.path.exists(path + ".gz"):
+                yield None
+                return
+            fd, temp_path = tempfile.mkstemp(suffix=".db")
+            with os.fdopen(fd, "wb") as out, gzip.open(path + ".gz", "rb") as src:
+                shutil.copyfileobj(src, out)
+            path = temp_path
+
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            yield conn
+        finally:
+            conn.close()
+            if temp_path:
+                os.remove(temp_path)
+
+    def query(self, area_code: str, start_month: str, end_month: str) -> List[Dict[str, Any]]:
+        """指定した月の範囲（YYYY-MM）の履歴を取得（該当する月のファイルのみ開く）"""
+        history = []
+        for month in self.partitions():
+            if not start_month <= month <= end_month:
+                continue
+            with self._open_partition(month) as conn:
+                if conn is None:
+                    continue
+                cursor = conn.execute('''
+                SELECT forecast_date, report_datetime, area_name, weather_code,
+                       weather_description, temperature_max, temperature_min,
+                       precipitation_probability
+                FROM forecast_archive
+                WHERE area_code = ?
+                ORDER BY forecast_date, report_datetime
+                ''', (area_code,))
+                for row in cursor:
+                    history.append({
+                        'area_code': area_code,
+                        'forecast_date': row[0],
+                        'report_datetime': row[1],
+                        'area_name': row[2],
+                        'weather_code': row[3],
+                        'weather_description': row[4],
+                        'temperature_max': row[5],
+                        'temperature_min': row[6],
+                        'precipitation_probability': row[7]
+                    })
+        return history
+
+    def compress(self, month: str) -> bool:
+        """月のファイルをgzip圧縮（以後は読み込み専用。今月以降はまだ追記されるので圧縮しない）"""
+        if month >= datetime.now().strftime('%Y-%m'):
+            print(f"今月以降の予報はまだ追記されるため圧縮できません: {month}")
+            return False
+        path = self._partition_path(month)
+        if not os.path.exists(path):
+            return False
+        temp_path = f"{path}.gz.{os.getpid()}.tmp"
+        with self._write_lock:
+            conn = sqlite3.connect(path, timeout=30)
+            try:
+                conn.execute("VACUUM")
+                # 圧縮が終わるまで他のプロセス（ingest.pyなど）の書き込みを待たせる
+                conn.execute("BEGIN IMMEDIATE")
+                with open(path, "rb") as src, gzip.open(temp_path, "wb") as out:
+                    shutil.copyfileobj(src, out)
+                os.replace(temp_path, path + ".gz")
+            except Exception as e:
+                print(f"アーカイブ圧縮エラー: {e}")
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                return False
+            finally:
+                conn.close()
+            os.remove(path)
+        return True
+
+    def drop(self, month: str) -> bool:
+        """月のファイルを削除"""
+        removed = False
+        with self._write_lock:
+            for path in (self._partition_path(month), self._partition_path(month) + ".gz"):
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed = True
+        return removed
+
+
+if __name__ == "__main__":
+    import sys
+
+    archive = ForecastArchive()
+    if sys.argv[1:2] == ["list"]:
+        for month in archive.partitions():
+            print(month)
+    elif sys.argv[1:2] in (["compress"], ["drop"]) and len(sys.argv) == 3:
+        action = getattr(archive, sys.argv[1])
+        print("完了" if action(sys.argv[2]) else f"対象がありません: {sys.argv[2]}")
+    else:
+        print("使い方: python forecast_archive.py [list | compress YYYY-MM | drop YYYY-MM]")
@@ -0,0 +1,135 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional
+
+from weather_database import WeatherDatabase
+
+JST = timezone(timedelta(hours=9))
+
+# 気象庁の天気予報の定時発表時刻（JST）
+PUBLICATION_HOURS = (5, 11, 17)
+# 発表時刻からデータが差し替わるまでの猶予
+PUBLICATION_DELAY = timedelta(minutes=10)
+# 再検証後、次に問い合わせるまでの最短間隔（秒）
+MIN_TTL = 5 * 60
+
+
+def next_publication(report_datetime: Optional[str]) -> Optional[datetime]:
+    """reportDatetimeの次の定時発表時刻（猶予込み）を計算"""
+    if not report_datetime:
+        return None
+    try:
+        reported = datetime.fromisoformat(report_datetime).astimezone(JST)
+    except ValueError:
+        return None
+
+    day = reported.replace(minute=0, second=0, microsecond=0)
+    for offset in range(2):
+        for hour in PUBLICATION_HOURS:
+            candidate = (day + timedelta(days=offset)).replace(hour=hour)
+            if candidate > reported:
+                return candidate + PUBLICATION_DELAY
+    return None
+
+
+def compute_expires_at(report_datetime: Optional[str], now: Optional[float] = None) -> float:
+    """キャッシュの有効期限（UNIX時刻）を計算"""
+    now = time.time() if now is None else now
+    published = next_publication(report_datetime)
+    if published is None:
+        return now + MIN_TTL
+    return max(published.timestamp(), now + MIN_TTL)
+
+
+class CacheEntry:
+    """1地域分のキャッシュ（解析済みJSONと検証用ヘッダ）"""
+    __slots__ = ("data", "etag", "last_modified", "report_datetime", "expires_at")
+
+    def __init__(self, data: List[Any], etag: Optional[str], last_modified: Optional[str],
+                 report_datetime: Optional[str], expires_at: float):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.report_datetime = report_datetime
+        self.expires_at = expires_at
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (time.time() if now is None else now) < self.expires_at
+
+    def validators(self) -> dict:
+        """条件付きGET用のリクエストヘッダ"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ForecastCache:
+    """area_codeごとのAPIレスポンスキャッシュ（メモリLRU + weather.db）"""
+    _instance = None
+    _lock = threading.Lock()
+
+    MAX_ENTRIES = 64
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                instance = super().__new__(cls)
+                instance._entries = OrderedDict()
+                instance._entries_lock = threading.Lock()
+                cls._instance = instance
+        return cls._instance
+
+    def get(self, area_code: str) -> Optional[CacheEntry]:
+        """キャッシュの取得（メモリになければデータベースから復元）"""
+        with self._entries_lock:
+            entry = self._entries.get(area_code)
+            if entry is not None:
+                self._entries.move_to_end(area_code)
+                return entry
+
+        row = WeatherDatabase().get_api_cache(area_code)
+        if row is None:
+            return None
+        try:
+            data = json.loads(row['body'])
+        except ValueError:
+            return None
+        entry = CacheEntry(data, row['etag'], row['last_modified'], row['report_datetime'], row['expires_at'])
+        self._remember(area_code, entry)
+        return entry
+
+    def put(self, area_code: str, body: str, data: List[Any], etag: Optional[str],
+            last_modified: Optional[str]) -> CacheEntry:
+        """新しいレスポンスを保存"""
+        report_datetime = data[0].get('reportDatetime') if data else None
+        entry = CacheEntry(data, etag, last_modified, report_datetime, compute_expires_at(report_datetime))
+        self._remember(area_code, entry)
+        WeatherDatabase().save_api_cache(area_code, body, etag, last_modified, report_datetime, entry.expires_at)
+        return entry
+
+    def revalidated(self, area_code: str, entry: CacheEntry) -> CacheEntry:
+        """304応答を受けたキャッシュの有効期限を延長"""
+        entry.expires_at = compute_expires_at(entry.report_datetime)
+        self._remember(area_code, entry)
+        WeatherDatabase().save_api_cache(area_code, None, None, None, None, entry.expires_at)
+        return entry
+
+    def clear(self, persistent: bool = False):
+        """メモリ上のキャッシュを破棄（persistentならデータベースの分も）"""
+        with self._entries_lock:
+            self._entries.clear()
+        if persistent:
+            WeatherDatabase().clear_api_cache()
+
+    def _remember(self, area_code: str, entry: CacheEntry):
+        with self._entries_lock:
+            self._entries[area_code] = entry
+            self._entries.move_to_end(area_code)
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
@@ -0,0 +1,142 @@
+"""予報の更新通知（ingest.pyなどの保存処理 → 画面を開いている各セッション）
+
+保存した側は notify() で更新した地域コードをUDP（localhost）で送るだけ。画面側のプロセスは
+events.listen() で受け取り、共有の予報（ForecastStore）を読み込み直して、表示中のセッションに配る。
+"""
+import json
+import os
+import socket
+import threading
+from typing import Callable, Dict, Iterable, Optional, Set
+
+from forecast_store import Forecasts, ForecastStore
+
+# 通知に使うポート（環境変数JMA_EVENTS_PORTで変更）
+EVENTS_PORT = int(os.environ.get("JMA_EVENTS_PORT", "47651"))
+# 1回の送信に含める地域コードの数（UDPの1パケットに収まる量）
+CODES_PER_MESSAGE = 500
+
+ForecastCallback = Callable[[Dict[str, Forecasts]], None]
+
+
+def notify(area_codes: Iterable[str], port: int = EVENTS_PORT):
+    """更新した地域コードを画面側のプロセスに通知（受け取る側がいなくても何もしない）"""
+    codes = sorted(set(area_codes))
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            for i in range(0, len(codes), CODES_PER_MESSAGE):
+                message = json.dumps(codes[i:i + CODES_PER_MESSAGE]).encode("utf-8")
+                sock.sendto(message, ("127.0.0.1", port))
+    except OSError as e:
+        print(f"更新通知エラー: {e}")
+
+
+class Subscription:
+    """1セッション分の購読（表示中の地域が変わったらset_codesで差し替える）"""
+    __slots__ = ("callback", "codes", "_events")
+
+    def __init__(self, events: "ForecastEvents", callback: ForecastCallback):
+        self._events = events
+        self.callback = callback
+        self.codes: Set[str] = set()
+
+    def set_codes(self, area_codes: Iterable[str]):
+        self._events._set_codes(self, set(area_codes))
+
+    def close(self):
+        self._events._set_codes(self, set())
+
+
+class ForecastEvents:
+    """地域コードごとの購読者に、更新された予報を配る（プロセス内の全セッションで共有）"""
+
+    def __init__(self, store: Optional[ForecastStore] = None):
+        self._store = store
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._listener: Optional[threading.Thread] = None
+
+    @property
+    def store(self) -> ForecastStore:
+        # notify()だけを使う保存側のプロセスでデータベースを開かないよう、初めて配るときに取得する
+        if self._store is None:
+            self._store = ForecastStore()
+        return self._store
+
+    def subscribe(self, callback: ForecastCallback, area_codes: Iterable[str] = ()) -> Subscription:
+        """callbackには {地域コード: 予報のリスト}（購読中で更新された地域のみ）が渡される"""
+        subscription = Subscription(self, callback)
+        subscription.set_codes(area_codes)
+        return subscription
+
+    def _set_codes(self, subscription: Subscription, codes: Set[str]):
+        with self._lock:
+            for code in subscription.codes - codes:
+                subscribers = self._subscribers[code]
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[code]
+            for code in codes - subscription.codes:
+                self._subscribers.setdefault(code, set()).add(subscription)
+            subscription.codes = codes
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+    def publish(self, area_codes: Iterable[str]) -> int:
+        """更新された地域を購読者に配る（読み込みは購読者の数に関係なく1回）。戻り値は配った購読者の数"""
+        area_codes = set(area_codes)
+        # 購読者がいなくても、読み込み済みの地域は新しい予報に差し替える
+        self.store.refresh(area_codes)
+        with self._lock:
+            targets = {
+                code: list(self._subscribers[code])
+                for code in area_codes if code in self._subscribers
+            }
+        if not targets:
+            return 0
+
+        forecasts = self.store.get_many(targets)
+        changes: Dict[Subscription, Dict[str, Forecasts]] = {}
+        for code, subscribers in targets.items():
+            for subscription in subscribers:
+                changes.setdefault(subscription, {})[code] = forecasts.get(code, ())
+
+        for subscription, changed in changes.items():
+            try:
+                subscription.callback(changed)
+            except Exception as e:
+                # セッションが終了した場合など（他のセッションには配り続ける）
+                print(f"更新の反映エラー: {e}")
+        return len(changes)
+
+    def listen(self, port: int = EVENTS_PORT) -> bool:
+        """notify()の受け取りを開始（プロセスごとに一度だけ。ポートが使用中ならFalse）"""
+        with self._lock:
+            if self._listener is not None:
+                return True
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                sock.bind(("127.0.0.1", port))
+            except OSError as e:
+                sock.close()
+                print(f"更新通知の受信を開始できません: {e}")
+                return False
+            self._listener = threading.Thread(
+                target=self._receive, args=(sock,), name="forecast-events", daemon=True
+            )
+            self._listener.start()
+            return True
+
+    def _receive(self, sock: socket.socket):
+        while True:
+            data, _ = sock.recvfrom(65535)
+            try:
+                self.publish(json.loads(data.decode("utf-8")))
+            except Exception as e:
+                print(f"更新通知の処理エラー: {e}")
+
+
+# 画面側のプロセスで共有する購読の一覧
+events = ForecastEvents()
@@ -0,0 +1,84 @@
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+import flet as ft
+
+from icon_store import icon_src
+
+
+def format_value(value) -> str:
+    """気温・降水確率の表示（発表時刻によっては値が無い）"""
+    return "-" if value is None else str(value)
+
+
+class ForecastCard:
+    """1日分の予報カード（一度だけ作成し、表示する値だけを書き換える）"""
+    ICON_SIZE = 100
+
+    def __init__(self):
+        self.title = ft.Text(size=20, weight=ft.FontWeight.BOLD)
+        self.icon = ft.Image(width=self.ICON_SIZE, height=self.ICON_SIZE)
+        self.description = ft.Text(size=24, weight=ft.FontWeight.BOLD)
+        self.temperature = ft.Text(size=20)
+        self.probability = ft.Text(size=16)
+        self.view = ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Row([self.title]),
+                    ft.Row([
+                        ft.Column([
+                            ft.Row([
+                                self.icon,
+                                ft.Column([
+                                    self.description,
+                                    ft.Row([self.temperature]),
+                                    self.probability,
+                                ]),
+                            ]),
+                        ]),
+                    ]),
+                ]),
+                padding=15,
+            ),
+        )
+
+    def set(self, title: str, forecast: Mapping[str, Any]):
+        """表示内容の書き換え（値が変わった項目だけが画面に送られる）"""
+        self.title.value = title
+        self.icon.src = icon_src(forecast['weather_code'], self.ICON_SIZE)
+        self.description.value = forecast['weather_description']
+        self.temperature.value = (
+            f"気温：{format_value(forecast['temperature_min'])}℃"
+            f" / {format_value(forecast['temperature_max'])}℃"
+        )
+        self.probability.value = f"降水確率：{format_value(forecast['precipitation_probability'])}%"
+
+
+class ForecastPanel:
+    """天気ダイアログの中身（読み込み中・予報・メッセージを表示を切り替えて使い回す）"""
+
+    def __init__(self, on_close: Callable[[ft.ControlEvent], None]):
+        self.progress = ft.ProgressRing()
+        self.message = ft.Text(visible=False)
+        self.card = ForecastCard()
+        self.card.view.visible = False
+        self.close_button = ft.Row([
+            ft.TextButton("閉じる", on_click=on_close),
+        ], alignment=ft.MainAxisAlignment.END, visible=False)
+        self.view = ft.Column([self.progress, self.message, self.card.view, self.close_button], tight=True)
+
+    def _switch(self, target: Optional[ft.Control]):
+        self.progress.visible = target is self.progress
+        self.message.visible = target is self.message
+        self.card.view.visible = target is self.card.view
+        self.close_button.visible = target is not self.progress
+
+    def show_loading(self):
+        self._switch(self.progress)
+
+    def show_forecast(self, title: str, forecasts: Sequence[Mapping[str, Any]]):
+        self.card.set(title, forecasts[0])
+        self._switch(self.card.view)
+
+    def show_message(self, text: str):
+        self.message.value = text
+        self._switch(self.message)
@@ -0,0 +1,188 @@
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from forecast_records import ForecastBatch
+
+# 気象庁の予報JSONの要素（0: 3日間の短期予報, 1: 週間予報）
+SHORT_TERM = "short"
+WEEKLY = "weekly"
+TERMS = (SHORT_TERM, WEEKLY)
+
+# 天気の文章が無い日（週間予報のみの日）に使う大まかな説明（天気コードの百の位）
+WEATHER_GROUPS = {"1": "晴れ", "2": "くもり", "3": "雨", "4": "雪"}
+
+
+class TimeSeries:
+    """timeSeriesの1要素を列ごとの配列にしたもの（columns[項目][地域の順番][時刻の順番]）"""
+    __slots__ = ("term", "time_defines", "dates", "area_codes", "area_names", "columns")
+
+    def __init__(self, term: str, time_defines: Tuple[str, ...], area_codes: Tuple[str, ...],
+                 area_names: Tuple[str, ...], columns: Dict[str, List[List[Optional[str]]]]):
+        self.term = term
+        self.time_defines = time_defines
+        # timeDefinesはJSTの日時なので先頭10文字がその地域の日付
+        self.dates = tuple(t[:10] for t in time_defines)
+        self.area_codes = area_codes
+        self.area_names = area_names
+        self.columns = columns
+
+    def has(self, field: str) -> bool:
+        return field in self.columns
+
+    def __repr__(self) -> str:
+        return f"TimeSeries({self.term}, {len(self.area_codes)}地域 x {len(self.time_defines)}時刻, {list(self.columns)})"
+
+
+class ForecastReport:
+    """1府県予報区分の予報（短期・週間の全timeSeries）"""
+    __slots__ = ("publishing_office", "report_datetime", "series")
+
+    def __init__(self, publishing_office: Optional[str], report_datetime: Optional[str], series: List[TimeSeries]):
+        self.publishing_office = publishing_office
+        self.report_datetime = report_datetime
+        self.series = series
+
+    def find(self, term: str, field: str) -> Optional[TimeSeries]:
+        """指定した予報（短期・週間）で項目を含む最初のtimeSeries"""
+        for series in self.series:
+            if series.term == term and series.has(field):
+                return series
+        return None
+
+
+def parse_forecast(data: Union[List[Dict[str, Any]], Dict[str, Any]]) -> ForecastReport:
+    """予報JSON全体を1回の走査で列ごとの配列に変換（空文字はNone）"""
+    documents = data if isinstance(data, list) else [data]
+    series = []
+    for term, document in zip(TERMS, documents):
+        for entry in document.get('timeSeries', ()):
+            time_defines = tuple(entry.get('timeDefines', ()))
+            areas = entry.get('areas', ())
+            columns: Dict[str, List[List[Optional[str]]]] = {}
+            for index, area in enumerate(areas):
+                for field, values in area.items():
+                    if field == 'area' or not isinstance(values, list):
+                        continue
+                    # 地域によって項目が無い場合に備え、地域数分の列を用意
+                    column = columns.setdefault(field, [[None] * len(time_defines) for _ in areas])
+                    column[index][:len(values)] = [value if value != "" else None for value in values]
+            series.append(TimeSeries(
+                term,
+                time_defines,
+                tuple(area['area']['code'] for area in areas),
+                tuple(area['area']['name'] for area in areas),
+                columns,
+            ))
+    return ForecastReport(
+        documents[0].get('publishingOffice') if documents else None,
+        documents[0].get('reportDatetime') if documents else None,
+        series,
+    )
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def daily_forecasts(report: ForecastReport, area_code: str, area_name: str) -> ForecastBatch:
+    """日ごとの予報を、府県予報区（代表の一次細分区域）と全一次細分区域について作成"""
+    batch = ForecastBatch()
+    # (地域コード, 日付) → batchの行番号
+    rows: Dict[Tuple[str, str], int] = {}
+
+    def row(code: str, name: str, date: str) -> int:
+        index = rows.get((code, date))
+        if index is None:
+            index = rows[(code, date)] = batch.add(
+                code, name, code[:2], date, None, None, None, None, None, report.report_datetime
+            )
+        return index
+
+    # 天気（短期予報を優先し、その先の日は週間予報）
+    descriptions: Dict[str, str] = {}
+    weathers = report.find(SHORT_TERM, 'weatherCodes')
+    weekly = report.find(WEEKLY, 'weatherCodes')
+    for series in (weathers, weekly):
+        if series is None:
+            continue
+        codes = series.columns['weatherCodes']
+        texts = series.columns.get('weathers')
+        pops = series.columns.get('pops')
+        for a, (code, name) in enumerate(zip(series.area_codes, series.area_names)):
+            for t, date in enumerate(series.dates):
+                weather_code = codes[a][t]
+                if weather_code is None:
+                    continue
+                i = row(code, name, date)
+                if batch.weather_code[i] is None:
+                    batch.weather_code[i] = weather_code
+                    if texts is not None and texts[a][t]:
+                        batch.weather_description[i] = texts[a][t]
+                        descriptions.setdefault(weather_code, texts[a][t])
+                if pops is not None and batch.precipitation_probability[i] is None:
+                    batch.precipitation_probability[i] = _to_int(pops[a][t])
+
+    # 短期予報の降水確率（6時間ごと）はその日の最大値
+    series = report.find(SHORT_TERM, 'pops')
+    if series is not None:
+        for a, code in enumerate(series.area_codes):
+            by_date: Dict[str, int] = {}
+            for t, date in enumerate(series.dates):
+                value = _to_int(series.columns['pops'][a][t])
+                if value is not None:
+                    by_date[date] = max(by_date.get(date, value), value)
+            for date, value in by_date.items():
+                i = rows.get((code, date))
+                if i is not None:
+                    batch.precipitation_probability[i] = value
+
+    # 気温はアメダス地点ごと（地点の順番が天気の地域の順番に対応）
+    # 短期予報: 0時が朝の最低気温・9時が日中の最高気温
+    # （5時・11時の発表では今日の最低気温が無く、今日の0時には日中の最高気温が入るので最低気温にしない）
+    series = report.find(SHORT_TERM, 'temps')
+    if series is not None and weathers is not None:
+        report_date = (report.report_datetime or "")[:10]
+        for a, code in enumerate(weathers.area_codes[:len(series.area_codes)]):
+            values = [_to_int(value) for value in series.columns['temps'][a]]
+            daytime = {
+                date for time_define, date, value in zip(series.time_defines, series.dates, values)
+                if time_define[11:13] != "00" and value is not None
+            }
+            for time_define, date, value in zip(series.time_defines, series.dates, values):
+                i = rows.get((code, date))
+                if value is None or i is None:
+                    continue
+                if time_define[11:13] != "00":
+                    batch.temperature_max[i] = value
+                elif date > report_date or date not in daytime:
+                    batch.temperature_min[i] = value
+
+    series = report.find(WEEKLY, 'tempsMin')
+    if series is not None and weekly is not None:
+        for a, code in enumerate(weekly.area_codes[:len(series.area_codes)]):
+            for t, date in enumerate(series.dates):
+                i = rows.get((code, date))
+                if i is None:
+                    continue
+                for column, field in ((batch.temperature_min, 'tempsMin'), (batch.temperature_max, 'tempsMax')):
+                    if column[i] is None and series.has(field):
+                        column[i] = _to_int(series.columns[field][a][t])
+
+    for i, (weather_code, description) in enumerate(batch.rows('weather_code', 'weather_description')):
+        if description is None:
+            batch.weather_description[i] = descriptions.get(weather_code) or WEATHER_GROUPS.get(weather_code[:1], weather_code)
+
+    # 府県予報区の予報は先頭の一次細分区域（県庁所在地を含む地域）を代表とする
+    ordered = sorted(rows.items())
+    result = ForecastBatch()
+    if weathers is not None and weathers.area_codes:
+        representative = weathers.area_codes[0]
+        for (code, _), i in ordered:
+            if code == representative:
+                result.add(area_code, area_name, area_code[:2], *batch.row(i)[3:])
+    for (code, _), i in ordered:
+        if code != area_code:
+            result.add(*batch.row(i))
+    return result
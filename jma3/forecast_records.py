@@ -0,0 +1,85 @@
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+class ForecastRecord(NamedTuple):
+    """1地域・1日分の予報"""
+    area_code: str
+    area_name: str
+    region_code: str
+    forecast_date: str
+    weather_code: str
+    weather_description: str
+    temperature_max: Optional[int]
+    temperature_min: Optional[int]
+    precipitation_probability: Optional[int]
+    report_datetime: Optional[str]
+
+
+FIELDS = ForecastRecord._fields
+# 未設定を表す値（古い形式のデータでは空文字）
+_MISSING = ("temperature_max", "temperature_min", "precipitation_probability")
+
+
+class ForecastBatch:
+    """予報を項目ごとのリストで持つ入れ物（行ごとの辞書を作らずにexecutemanyへ渡す）"""
+    __slots__ = FIELDS + ("_columns",)
+
+    def __init__(self):
+        for field in FIELDS:
+            setattr(self, field, [])
+        self._columns: Tuple[List[Any], ...] = tuple(getattr(self, field) for field in FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.area_code)
+
+    def add(self, *values: Any) -> int:
+        """1行追加（値はFIELDSの順）して行番号を返す"""
+        for column, value in zip(self._columns, values):
+            column.append(value)
+        return len(self.area_code) - 1
+
+    def append(self, record: ForecastRecord):
+        self.add(*record)
+
+    def extend(self, other: "ForecastBatch"):
+        for column, values in zip(self._columns, other._columns):
+            column.extend(values)
+
+    def clear(self):
+        for column in self._columns:
+            column.clear()
+
+    def row(self, index: int) -> tuple:
+        """行番号の値（FIELDSの順）"""
+        return tuple(column[index] for column in self._columns)
+
+    def rows(self, *fields: str) -> Iterator[tuple]:
+        """指定した項目の値を行ごとのタプルで返す（executemany用）"""
+        return zip(*(getattr(self, field) for field in fields))
+
+    def records(self) -> Iterator[ForecastRecord]:
+        return map(ForecastRecord._make, zip(*self._columns))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """辞書のリストに変換（画面表示など従来の形式が必要な場合）"""
+        return [dict(zip(FIELDS, row)) for row in zip(*self._columns)]
+
+    @classmethod
+    def from_dicts(cls, weather_data_list: Iterable[Dict[str, Any]]) -> "ForecastBatch":
+        """辞書のリストから作成（空文字の気温・降水確率はNone）"""
+        batch = cls()
+        for d in weather_data_list:
+            batch.add(*(
+                None if field in _MISSING and d.get(field) == "" else d.get(field)
+                for field in FIELDS
+            ))
+        return batch
+
+    @classmethod
+    def of(cls, weather_data: "ForecastData") -> "ForecastBatch":
+        """ForecastBatchはそのまま、辞書のリストは変換して返す"""
+        return weather_data if isinstance(weather_data, cls) else cls.from_dicts(weather_data)
+
+
+# 保存処理が受け取る予報（ForecastBatchまたは従来の辞書のリスト）
+ForecastData = Union[ForecastBatch, List[Dict[str, Any]]]
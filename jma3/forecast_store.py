@@ -0,0 +1,120 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Tuple
+
+from forecast_cache import JST
+from single_flight import SingleFlight
+from weather_database import WeatherDatabase
+
+Forecasts = Tuple[Mapping[str, Any], ...]
+
+
+def _today() -> str:
+    """日本時間の今日（予報の日付は気象庁の発表どおり日本時間で保存している）"""
+    return datetime.now(JST).strftime('%Y-%m-%d')
+
+
+class AreaSnapshot(NamedTuple):
+    """1地域分の予報（読み込んだ後は変更しない。更新時は新しいものに差し替える）"""
+    area_code: str
+    # 読み込んだ日（日本時間。日付が変わったら読み込み直す）
+    date: str
+    forecasts: Forecasts
+    # 読み込んだ時刻（ForecastStore.max_ageを過ぎたら読み込み直す）
+    loaded_at: float
+
+
+class ForecastStore:
+    """プロセス内の全セッションで共有する予報（地域ごとの読み取り専用スナップショット）
+
+    読み込みはロック無しで現在の辞書を参照するだけ。更新は新しい辞書を作って参照を1回で差し替える。
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    # 表示する日数（今日から）
+    DAYS = 3
+    # 読み込み直すまでの時間（秒）。更新通知で差し替え損ねても、この時間を過ぎれば読み込み直す
+    MAX_AGE = 60 * 60
+    # 更新通知を受け取れないプロセスでの読み込み直すまでの時間（秒）
+    UNNOTIFIED_MAX_AGE = 5 * 60
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                instance = super().__new__(cls)
+                instance.db = WeatherDatabase()
+                instance._snapshots = {}
+                instance._write_lock = threading.Lock()
+                # 同じ地域を同時に開いたセッションの読み込みは1回にまとめる
+                instance._flights = SingleFlight()
+                instance.loads = 0
+                instance.max_age = cls.MAX_AGE
+                cls._instance = instance
+        return cls._instance
+
+    def get(self, area_code: str) -> Forecasts:
+        """今日から表示日数分の予報（全セッションで同じオブジェクトを返す）"""
+        return self.get_many([area_code])[area_code]
+
+    def get_many(self, area_codes: Iterable[str]) -> Dict[str, Forecasts]:
+        """複数地域の予報（持っていない地域だけを1回のクエリで読み込む）"""
+        today = _today()
+        expired = time.time() - self.max_age
+        snapshots = self._snapshots
+        result = {}
+        missing = []
+        for area_code in area_codes:
+            snapshot = snapshots.get(area_code)
+            if snapshot is not None and snapshot.date == today and snapshot.loaded_at > expired:
+                result[area_code] = snapshot.forecasts
+            else:
+                missing.append(area_code)
+        if missing:
+            result.update(self._flights.do((today, *missing), self._load, missing, today))
+        return result
+
+    def refresh(self, area_codes: Iterable[str]) -> int:
+        """保存し直された地域のうち、読み込み済みのものを読み込み直す。戻り値は読み込んだ地域の数"""
+        snapshots = self._snapshots
+        held = [area_code for area_code in set(area_codes) if area_code in snapshots]
+        if held:
+            self._load(held, _today())
+        return len(held)
+
+    def _load(self, area_codes: List[str], today: str) -> Dict[str, Forecasts]:
+        end = (datetime.strptime(today, '%Y-%m-%d') + timedelta(days=self.DAYS - 1)).strftime('%Y-%m-%d')
+        loaded_at = time.time()
+        rows = self.db.get_forecast_range(area_codes, today, end)
+        loaded = {
+            area_code: AreaSnapshot(
+                area_code, today, tuple(MappingProxyType(row) for row in forecasts), loaded_at
+            )
+            for area_code, forecasts in rows.items()
+        }
+        with self._write_lock:
+            snapshots = dict(self._snapshots)
+            # まだ保存されていない地域は持たない（次の表示で読み込み直す）
+            for area_code, snapshot in loaded.items():
+                current = snapshots.get(area_code)
+                if current is not None and current.loaded_at > loaded_at:
+                    # 後から始まった読み込みが先に差し替えていれば、そちらを残す
+                    continue
+                if snapshot.forecasts:
+                    snapshots[area_code] = snapshot
+                else:
+                    snapshots.pop(area_code, None)
+            self._snapshots = snapshots
+            self.loads += 1
+        return {area_code: snapshot.forecasts for area_code, snapshot in loaded.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        """保持している地域・予報の数とデータベースからの読み込み回数"""
+        snapshots = self._snapshots
+        return {
+            "areas": len(snapshots),
+            "forecasts": sum(len(snapshot.forecasts) for snapshot in snapshots.values()),
+            "loads": self.loads,
+        }
@@ -0,0 +1,80 @@
+import threading
+from typing import Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class _CountingRetry(Retry):
+    """再試行した回数を数えるRetry（ingest.pyの実行結果に記録）"""
+    count = 0
+    _count_lock = threading.Lock()
+
+    def increment(self, *args, **kwargs):
+        new_retry = super().increment(*args, **kwargs)
+        with _CountingRetry._count_lock:
+            _CountingRetry.count += 1
+        return new_retry
+
+
+class HTTPClient:
+    """気象庁APIへの接続を使い回す共有HTTPクライアント（一時的な失敗の再試行はここだけで行う）"""
+    _instance = None
+    _lock = threading.Lock()
+
+    # 接続・読み込みタイムアウト（秒）
+    CONNECT_TIMEOUT = 3.05
+    READ_TIMEOUT = 10.0
+    # ホストごとに保持するコネクション数
+    POOL_CONNECTIONS = 4
+    POOL_MAXSIZE = 16
+    # リトライ設定（0.5秒, 1秒, 2秒... と間隔を広げる）
+    MAX_RETRIES = 3
+    BACKOFF_FACTOR = 0.5
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                instance = super().__new__(cls)
+                instance._session = instance._create_session()
+                cls._instance = instance
+        return cls._instance
+
+    def _create_session(self) -> requests.Session:
+        """Keep-Alive・リトライ付きのセッションを作成"""
+        # 接続エラー・タイムアウト・429/5xxのみ再試行（404などは再試行しない）
+        retry = _CountingRetry(
+            total=self.MAX_RETRIES,
+            backoff_factor=self.BACKOFF_FACTOR,
+            status_forcelist=self.RETRY_STATUS,
+            allowed_methods=("GET", "HEAD"),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.POOL_CONNECTIONS,
+            pool_maxsize=self.POOL_MAXSIZE,
+            pool_block=True,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def retries(self) -> int:
+        """プロセス内でこれまでに再試行した回数"""
+        return _CountingRetry.count
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.CONNECT_TIMEOUT, self.READ_TIMEOUT)
+
+    def get(self, url: str, timeout: Optional[Tuple[float, float]] = None, **kwargs) -> requests.Response:
+        """共有セッションでGETリクエストを送信"""
+        return self._session.get(url, timeout=timeout or self.timeout, **kwargs)
+
+    def close(self):
+        """保持しているコネクションを解放"""
+        self._session.close()
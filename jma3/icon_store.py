@@ -0,0 +1,127 @@
+"""天気アイコンの保存先（assets/icons）と表示用パス
+
+使い方:
+    python icon_store.py fetch          # 既知の全天気コードのSVGを気象庁から取得
+    python icon_store.py fetch --png    # あわせてカードの大きさのPNGも作成（cairosvgが必要）
+"""
+import argparse
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from http_client import HTTPClient
+
+try:
+    import cairosvg
+except ImportError:  # PNGの作成は任意
+    cairosvg = None
+
+ICON_URL = "https://www.jma.go.jp/bosai/forecast/img"
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+ICONS_DIR = os.path.join(ASSETS_DIR, "icons")
+# カードに表示する大きさ（px）
+PNG_SIZES = (50, 100)
+# 見つからないアイコンがあったとき、一覧を取得し直す間隔（秒）
+RESCAN_SECONDS = 60
+
+# 気象庁の天気予報で使われる天気コード
+KNOWN_WEATHER_CODES = (
+    "100", "101", "102", "103", "104", "105", "106", "107", "108", "110", "111", "112",
+    "113", "114", "115", "116", "117", "118", "119", "120", "121", "122", "123", "124",
+    "125", "126", "127", "128", "130", "131", "132", "140", "160", "170", "181",
+    "200", "201", "202", "203", "204", "205", "206", "207", "208", "209", "210", "211",
+    "212", "213", "214", "215", "216", "217", "218", "219", "220", "221", "222", "223",
+    "224", "225", "226", "228", "229", "230", "231", "240", "250", "260", "270", "281",
+    "300", "301", "302", "303", "304", "306", "308", "309", "311", "313", "314", "315",
+    "316", "317", "320", "321", "322", "323", "324", "325", "326", "327", "328", "329",
+    "340", "350", "361", "371",
+    "400", "401", "402", "403", "405", "406", "407", "409", "411", "413", "414", "420",
+    "421", "422", "423", "425", "426", "427", "450",
+)
+
+_available: Optional[Set[str]] = None
+_available_at = 0.0
+_available_lock = threading.Lock()
+
+
+def _files(rescan: bool = False) -> Set[str]:
+    """assets/iconsにあるファイル名（rescanなら、前回の取得からRESCAN_SECONDS経っていれば取得し直す）"""
+    global _available, _available_at
+    with _available_lock:
+        now = time.monotonic()
+        if _available is None or (rescan and now - _available_at >= RESCAN_SECONDS):
+            # 別のプロセス（ingest.pyなど）が後から保存したアイコンも使えるようにする
+            _available = set(os.listdir(ICONS_DIR)) if os.path.isdir(ICONS_DIR) else set()
+            _available_at = now
+        return _available
+
+
+def _local_src(files: Set[str], weather_code: str, size: Optional[int]) -> Optional[str]:
+    for code in (weather_code, f"{weather_code[:1]}00"):
+        if size and f"{code}_{size}.png" in files:
+            return f"/icons/{code}_{size}.png"
+        if f"{code}.svg" in files:
+            return f"/icons/{code}.svg"
+    return None
+
+
+def icon_src(weather_code: str, size: Optional[int] = None) -> str:
+    """表示用のアイコンのパス（PNG → SVG → 同じ系統の代表アイコン → 気象庁のURL の順）"""
+    src = _local_src(_files(), weather_code, size)
+    if src is None:
+        src = _local_src(_files(rescan=True), weather_code, size)
+    return src or f"{ICON_URL}/{weather_code}.svg"
+
+
+def fetch_icons(codes: Optional[Iterable[str]] = None, png: bool = False) -> Dict[str, List[str]]:
+    """まだ保存していないアイコンを取得して保存（pngならカードの大きさのPNGも作成）"""
+    global _available
+    os.makedirs(ICONS_DIR, exist_ok=True)
+    client = HTTPClient()
+    result = {"fetched": [], "failed": [], "rasterized": []}
+    for code in sorted(set(codes or KNOWN_WEATHER_CODES)):
+        path = os.path.join(ICONS_DIR, f"{code}.svg")
+        if not os.path.exists(path):
+            try:
+                response = client.get(f"{ICON_URL}/{code}.svg")
+                response.raise_for_status()
+            except Exception as e:
+                print(f"アイコン取得エラー（{code}）: {e}")
+                result["failed"].append(code)
+                continue
+            # 画面側が書きかけのファイルを読まないよう、一時ファイルに書いてから置き換える
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(response.content)
+            os.replace(temp_path, path)
+            result["fetched"].append(code)
+
+        if png:
+            if cairosvg is None:
+                print("PNGの作成にはcairosvgが必要です（pip install cairosvg）")
+                png = False
+                continue
+            for size in PNG_SIZES:
+                png_path = os.path.join(ICONS_DIR, f"{code}_{size}.png")
+                if not os.path.exists(png_path):
+                    cairosvg.svg2png(url=path, write_to=png_path, output_width=size, output_height=size)
+                    result["rasterized"].append(png_path)
+
+    # 次の表示から新しいファイルを使う
+    with _available_lock:
+        _available = None
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("fetch",))
+    parser.add_argument("--png", action="store_true", help="PNGも作成する")
+    args = parser.parse_args()
+
+    result = fetch_icons(png=args.png)
+    print(
+        f"取得 {len(result['fetched'])}件 / PNG {len(result['rasterized'])}件"
+        f" / 失敗 {len(result['failed'])}件"
+    )
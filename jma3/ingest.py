@@ -0,0 +1,237 @@
+"""全府県予報区の天気を気象庁の定時発表に合わせて取得し、データベースに保存する常駐プロセス
+
+使い方:
+    python ingest.py            # 起動時に1回取得し、以後は05/11/17時（JST）の発表後に取得
+    python ingest.py once       # 1回だけ取得して終了
+    python ingest.py runs       # 直近の実行結果を表示
+
+    --transport record:DIR で取得したレスポンスを保存、fixtures:DIR で保存済みのレスポンスから取り込み
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from area_registry import AreaRegistry
+from forecast_archive import ForecastArchive
+from forecast_cache import JST, PUBLICATION_DELAY, PUBLICATION_HOURS
+from forecast_events import notify
+from forecast_records import ForecastBatch
+from http_client import HTTPClient
+from icon_store import KNOWN_WEATHER_CODES, fetch_icons
+from transports import BASE_URL
+from weather_api import WeatherAPI
+from weather_database import WeatherDatabase
+
+# 同時に実行する取得処理の上限
+DEFAULT_CONCURRENCY = 8
+# 各取得の開始をずらす最大時間（秒）
+JITTER_SECONDS = 2.0
+# この件数が溜まるごとに1トランザクションで保存
+BATCH_SIZE = 200
+# 発表が遅れて前回の予報が返ってきた地域を取得し直す回数と間隔（秒）
+REPOLL_ATTEMPTS = 2
+REPOLL_SECONDS = 10 * 60
+
+
+def load_office_areas() -> List[Tuple[str, str]]:
+    """areas.jsonから府県予報区（offices）の名前とコードを取得"""
+    return [(office.name, office.code) for office in AreaRegistry().offices()]
+
+
+def next_run(now: Optional[datetime] = None) -> datetime:
+    """次の定時発表（データ差し替えの猶予込み）の時刻"""
+    now = (now or datetime.now(JST)).astimezone(JST)
+    day = now.replace(minute=0, second=0, microsecond=0)
+    for offset in range(2):
+        for hour in PUBLICATION_HOURS:
+            candidate = (day + timedelta(days=offset)).replace(hour=hour) + PUBLICATION_DELAY
+            if candidate > now:
+                return candidate
+    raise ValueError("次の発表時刻を計算できません")
+
+
+def current_slot(now: Optional[datetime] = None) -> datetime:
+    """直近の定時発表の時刻（これより前の発表の予報は、まだ新しい発表に置き換わっていない）"""
+    now = (now or datetime.now(JST)).astimezone(JST)
+    day = now.replace(minute=0, second=0, microsecond=0)
+    for offset in (0, -1):
+        for hour in reversed(PUBLICATION_HOURS):
+            candidate = (day + timedelta(days=offset)).replace(hour=hour)
+            if candidate <= now:
+                return candidate
+    raise ValueError("直近の発表時刻を計算できません")
+
+
+def _is_stale(batch: ForecastBatch, slot: datetime) -> bool:
+    """取得した予報の発表時刻が直近の定時発表より古いか（気象庁の発表が遅れている）"""
+    reported = [value for value in batch.report_datetime if value]
+    if not reported:
+        return False
+    try:
+        return max(datetime.fromisoformat(value) for value in reported) < slot
+    except ValueError:
+        return False
+
+
+async def _fetch(semaphore: asyncio.Semaphore, api: WeatherAPI,
+                 area_name: str, area_code: str, jitter: float) -> Optional[ForecastBatch]:
+    """1地域分の取得と整形（一時的な失敗の再試行はHTTPClientが行うので、ここでは繰り返さない）"""
+    # 全地域が同時に要求しないよう開始をずらす
+    if jitter:
+        await asyncio.sleep(random.uniform(0, jitter))
+    async with semaphore:
+        raw_data = await asyncio.to_thread(api.fetch_weather_data, area_code)
+    if not raw_data:
+        return None
+    return api.process_weather_batch(raw_data, area_code, area_name)
+
+
+async def ingest_areas(areas: List[Tuple[str, str]], concurrency: int = DEFAULT_CONCURRENCY,
+                       jitter: float = JITTER_SECONDS) -> Dict[str, Any]:
+    """全地域を取得し、一定件数ごとにまとめて保存（jitterは各取得の開始をずらす最大時間）"""
+    started_at = datetime.now(JST)
+    slot = current_slot(started_at)
+    start = time.perf_counter()
+    api = WeatherAPI()
+    db = WeatherDatabase()
+    archive = ForecastArchive()
+    semaphore = asyncio.Semaphore(concurrency)
+    retries_before = HTTPClient().retries
+
+    save_seconds = 0.0
+    batches = 0
+    records = 0
+    failed = []
+    stale = []
+    pending = ForecastBatch()
+    # pendingに含まれる府県予報区のコード
+    pending_areas: List[str] = []
+
+    async def flush():
+        nonlocal pending, pending_areas, save_seconds, batches, records
+        if not len(pending):
+            return
+        batch, batch_areas = pending, pending_areas
+        pending, pending_areas = ForecastBatch(), []
+        saved_at = time.perf_counter()
+        saved = await asyncio.to_thread(db.save_weather_batch, batch)
+        if saved:
+            await asyncio.to_thread(archive.append, batch)
+            # 画面を開いているセッションに更新を知らせる
+            notify(batch.area_code)
+        save_seconds += time.perf_counter() - saved_at
+        if not saved:
+            # 保存できなかった地域は失敗として扱い、取得し直す
+            failed.extend(batch_areas)
+            return
+        batches += 1
+        records += len(batch)
+
+    async def fetch(area_name: str, area_code: str):
+        try:
+            batch = await _fetch(semaphore, api, area_name, area_code, jitter)
+        except Exception as e:
+            print(f"取得エラー（{area_code}）: {e}")
+            batch = None
+        return area_code, batch
+
+    tasks = [asyncio.create_task(fetch(name, code)) for name, code in areas]
+    for task in asyncio.as_completed(tasks):
+        area_code, batch = await task
+        if batch is not None and len(batch):
+            pending.extend(batch)
+            pending_areas.append(area_code)
+            if _is_stale(batch, slot):
+                stale.append(area_code)
+        else:
+            failed.append(area_code)
+        if len(pending) >= BATCH_SIZE:
+            await flush()
+    await flush()
+
+    total_seconds = time.perf_counter() - start
+    return {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "areas": len(areas),
+        "succeeded": len(areas) - len(failed),
+        "failed": sorted(failed),
+        "stale": sorted(set(stale) - set(failed)),
+        "records": records,
+        "batches": batches,
+        "retries": HTTPClient().retries - retries_before,
+        "fetch_seconds": total_seconds - save_seconds,
+        "save_seconds": save_seconds,
+        "total_seconds": total_seconds,
+    }
+
+
+def run_once(concurrency: int = DEFAULT_CONCURRENCY, area_codes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """1回分の取得を実行し、結果をデータベースに記録（area_codesを指定するとその地域のみ）"""
+    db = WeatherDatabase()
+    areas = load_office_areas()
+    if area_codes is not None:
+        areas = [(name, code) for name, code in areas if code in area_codes]
+    stats = asyncio.run(ingest_areas(areas, concurrency))
+    db.save_ingest_run(stats)
+    report(stats)
+    # 新しい天気コードのアイコンを保存（保存済みのものは取得しない。気象庁から取得しているときのみ）
+    if stats["succeeded"] and getattr(WeatherAPI.transport, "base_url", None) == BASE_URL:
+        fetch_icons(set(KNOWN_WEATHER_CODES) | set(db.get_weather_codes()))
+    return stats
+
+
+def run_forever(concurrency: int = DEFAULT_CONCURRENCY):
+    """起動時に1回取得し、以後は定時発表ごとに取得（発表が遅れた地域・失敗した地域は少し待って取得し直す）"""
+    while True:
+        try:
+            stats = run_once(concurrency)
+            for _ in range(REPOLL_ATTEMPTS):
+                retry = sorted(set(stats["stale"]) | set(stats["failed"]))
+                if not retry:
+                    break
+                print(f"{REPOLL_SECONDS // 60}分後に取得し直します: {', '.join(retry)}")
+                time.sleep(REPOLL_SECONDS)
+                stats = run_once(concurrency, retry)
+        except Exception as e:
+            print(f"取得処理エラー: {e}")
+        scheduled = next_run()
+        print(f"次回の取得: {scheduled.strftime('%Y-%m-%d %H:%M')}（JST）")
+        time.sleep(max((scheduled - datetime.now(JST)).total_seconds(), 0))
+
+
+def report(stats: Dict[str, Any]):
+    """実行結果の表示"""
+    print(
+        f"[{stats['started_at']}] {stats['succeeded']}/{stats['areas']}地域 {stats['records']}件"
+        f"（{stats['batches']}回に分けて保存・再試行{stats['retries']}回）"
+        f" 取得 {stats['fetch_seconds']:.2f}s / 保存 {stats['save_seconds']:.2f}s"
+        f" / 合計 {stats['total_seconds']:.2f}s"
+    )
+    if stats["failed"]:
+        print(f"取得失敗: {', '.join(stats['failed'])}")
+    if stats.get("stale"):
+        print(f"新しい発表がまだ無い地域: {', '.join(stats['stale'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", nargs="?", choices=("once", "runs"))
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同時取得数")
+    parser.add_argument("--transport", help="取得方法（live / fixtures:DIR / stub:DIR / record:DIR）")
+    args = parser.parse_args()
+    if args.transport:
+        WeatherAPI.use_transport(args.transport)
+
+    if args.command == "once":
+        run_once(args.concurrency)
+    elif args.command == "runs":
+        for run in WeatherDatabase().get_ingest_runs():
+            report(run)
+    else:
+        try:
+            run_forever(args.concurrency)
+        except KeyboardInterrupt:
+            pass
@@ -1,7 +1,17 @@
 import flet as ft
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from weather_database import WeatherDatabase
-from weather_api import WeatherAPI
+from typing import Dict
+from forecast_store import ForecastStore
+from area_registry import AreaRegistry
+from sub_area_list import SubAreaList
+from forecast_panel import ForecastPanel
+from dashboard import Dashboard
+from forecast_events import events
+
+# 共有の予報に無い地域をデータベースから読み込むスレッドプール（全セッションで共有）
+executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="forecast")
 
 def main(page: ft.Page):
     page.title = "天気予報アプリ"
@@ -10,133 +20,204 @@ def main(page: ft.Page):
     page.window_height = 600  # 一時的に古い方法を使用
     page.padding = 20
 
-    db = WeatherDatabase()
-    api = WeatherAPI()
+    # 予報・地域一覧はプロセス内の全セッションで共有（セッションごとに持つのは画面の部品だけ）
+    store = ForecastStore()
+    registry = AreaRegistry()
+    # 天気情報の取得・保存はingest.pyが定時に行い、画面はデータベースを読むだけ
+    # （保存されたら更新通知を受け取り、表示中の地域だけを書き換える）
+    if not events.listen():
+        # 通知を受け取れないときは、読み込んだ予報を短い間隔で読み込み直す
+        store.max_age = ForecastStore.UNNOTIFIED_MAX_AGE
 
+    # ダイアログと中身はセッションごとに一度だけ作成し、表示内容だけを書き換える
+    panel = ForecastPanel(on_close=lambda e: close_dialog(e))
     dialog = ft.AlertDialog(
-        content=ft.ProgressRing(),
+        content=panel.view,
     )
     page.overlay.append(dialog)  # 新しい方法でダイアログを追加
 
-    def update_weather_display(area_name: str, area_code: str):
-        """天気情報の表示を更新"""
-        def close_dialog(e):
-            dialog.open = False
-            page.update()
+    # 取得処理の状態（セッションごと）
+    # current: 最後に要求した番号（これより古い要求の結果は表示しない）
+    # in_flight: 取得中の地域コード → Future（連打しても取得は1回だけ）
+    # shown: ダイアログに表示中の地域コードと見出し（更新通知で書き換える対象）
+    request_state = {"current": 0, "future": None, "shown": None}
+    in_flight: Dict[str, Future] = {}
+    state_lock = threading.Lock()
+
+    def close_dialog(e):
+        with state_lock:
+            request_state["current"] += 1  # 取得中の結果は表示しない
+            request_state["shown"] = None
+        subscription.set_codes(())
+        dialog.open = False
+        dialog.update()
 
-        dialog.content = ft.ProgressRing()
+    def forget_in_flight(area_code: str, future: Future):
+        with state_lock:
+            if in_flight.get(area_code) is future:
+                del in_flight[area_code]
+
+    def update_weather_display(area_name: str, area_code: str, label: str = None):
+        """天気情報の取得を開始（labelは見出しに使う名前。市町村から開いた場合など）"""
+        panel.show_loading()
         dialog.open = True
-        page.update()
-
-        # APIからデータを取得
-        raw_data = api.fetch_weather_data(area_code)
-        if raw_data:
-            weather_data_list = api.process_weather_data(raw_data, area_code, area_name)
-            
-            # データベースに保存
-            for weather_data in weather_data_list:
-                db.save_weather_data(weather_data)
-
-            # カードの作成
-            dialog.content = ft.Column([
-                ft.Card(
-                    content=ft.Container(
-                        content=ft.Column([
-                            ft.Row([
-                                ft.Text(f"{area_name}の天気", size=20, weight=ft.FontWeight.BOLD),
-                            ]),
-                            ft.Row([
-                                ft.Column([
-                                    ft.Row([
-                                        ft.Image(
-                                            src=f"https://www.jma.go.jp/bosai/forecast/img/{weather_data_list[0]['weather_code']}.svg",
-                                            width=100,
-                                            height=100,
-                                        ),
-                                        ft.Column([
-                                            ft.Text(
-                                                weather_data_list[0]['weather_description'],
-                                                size=24,
-                                                weight=ft.FontWeight.BOLD
-                                            ),
-                                            ft.Row([
-                                                ft.Text(
-                                                    f"気温：{weather_data_list[0]['temperature_min']}℃ / {weather_data_list[0]['temperature_max']}℃",
-                                                    size=20,
-                                                ),
-                                            ]),
-                                            ft.Text(
-                                                f"降水確率：{weather_data_list[0]['precipitation_probability']}%",
-                                                size=16,
-                                            ),
-                                        ]),
-                                    ]),
-                                ]),
-                            ]),
-                        ]),
-                        padding=15,
-                    ),
-                ),
-                ft.Row([
-                    ft.TextButton(
-                        "閉じる",
-                        on_click=close_dialog
-                    ),
-                ], alignment=ft.MainAxisAlignment.END),
-            ])
+        dialog.update()
+
+        # 保存済みの予報を読み込む（スレッドプールで実行）
+        with state_lock:
+            request_state["current"] += 1
+            request_state["shown"] = None
+            request_id = request_state["current"]
+            previous = request_state["future"]
+            future = in_flight.get(area_code)
+            submitted = future is None
+            if submitted:
+                future = executor.submit(store.get, area_code)
+                in_flight[area_code] = future
+            request_state["future"] = future
+
+        # コールバックはその場で実行されることがあるため、ロックの外で登録する
+        if submitted:
+            future.add_done_callback(lambda f: forget_in_flight(area_code, f))
+        # 前のクリックの取得がまだ始まっていなければ取り消す
+        if previous is not None and previous is not future:
+            previous.cancel()
+        future.add_done_callback(lambda f: show_weather(request_id, area_name, area_code, label, f))
+
+    def show_weather(request_id: int, area_name: str, area_code: str, label: str, future: Future):
+        """取得結果の表示（新しい要求に置き換えられていれば何もしない）"""
+        title = f"{label or area_name}の天気"
+        with state_lock:
+            if future.cancelled() or request_id != request_state["current"]:
+                return
+            request_state["shown"] = (area_code, title)
+        # 以後はこの地域の更新通知だけを受け取る
+        subscription.set_codes([area_code])
+        try:
+            weather_data_list = future.result()
+        except Exception as e:
+            print(f"天気情報の取得エラー: {e}")
+            weather_data_list = []
+
+        if weather_data_list:
+            panel.show_forecast(title, weather_data_list)
         else:
-            dialog.content = ft.Text("天気情報の取得に失敗しました")
+            panel.show_message("天気情報がまだありません（python ingest.py で取得してください）")
 
         dialog.open = True
-        page.update()
-
-    # 地域選択ボタンの作成
-    buttons = [
-        ["北海道", "016000"], ["青森", "020000"], ["岩手", "030000"],
-        ["宮城", "040000"], ["秋田", "050000"], ["山形", "060000"],
-        ["福島", "070000"], ["茨城", "080000"], ["栃木", "090000"],
-        ["群馬", "100000"], ["埼玉", "110000"], ["千葉", "120000"],
-        ["東京", "130000"], ["神奈川", "140000"], ["新潟", "150000"],
-        ["富山", "160000"], ["石川", "170000"], ["福井", "180000"],
-        ["山梨", "190000"], ["長野", "200000"], ["岐阜", "210000"],
-        ["静岡", "220000"], ["愛知", "230000"], ["三重", "240000"],
-        ["滋賀", "250000"], ["京都", "260000"], ["大阪", "270000"],
-        ["兵庫", "280000"], ["奈良", "290000"], ["和歌山", "300000"],
-        ["鳥取", "310000"], ["島根", "320000"], ["岡山", "330000"],
-        ["広島", "340000"], ["山口", "350000"], ["徳島", "360000"],
-        ["香川", "370000"], ["愛媛", "380000"], ["高知", "390000"],
-        ["福岡", "400000"], ["佐賀", "410000"], ["長崎", "420000"],
-        ["熊本", "430000"], ["大分", "440000"], ["宮崎", "450000"],
-        ["鹿児島", "460100"], ["沖縄", "471000"]
-    ]
-
-    rows = []
-    current_row = []
-    
-    for name, code in buttons:
-        if len(current_row) == 8:  # 8ボタンごとに新しい行を作成
-            rows.append(ft.Row(current_row, wrap=True))
-            current_row = []
-            
-        current_row.append(
-            ft.ElevatedButton(
-                text=name,
-                on_click=lambda e, name=name, code=code: update_weather_display(name, code)
+        dialog.update()
+
+    def apply_update(changed: Dict[str, tuple]):
+        """更新通知の反映（ダイアログに表示中の地域の予報だけを書き換える）"""
+        with state_lock:
+            shown = request_state["shown"]
+            forecasts = changed.get(shown[0]) if shown else None
+            if not forecasts:
+                return
+            panel.show_forecast(shown[1], forecasts)
+        dialog.update()
+
+    subscription = events.subscribe(apply_update)
+
+    # 市町村の一覧（表示範囲だけ作成するリスト）
+    def select_sub_area(node):
+        office = node.ancestor("offices")
+        if office:
+            update_weather_display(office.name, office.code, label=node.name)
+
+    sub_areas = SubAreaList(on_select=select_sub_area)
+    sub_areas.set_nodes(registry.nodes("class20s"))
+    sub_area_title = ft.Text("全国の市町村", size=16, weight=ft.FontWeight.BOLD)
+
+    def search_sub_areas(e):
+        keyword = e.control.value.strip()
+        if keyword:
+            sub_area_title.value = f"「{keyword}」の検索結果"
+            sub_areas.set_nodes([
+                node for node in registry.search(keyword, limit=500)
+                if node.level_name == "class20s"
+            ])
+        else:
+            sub_area_title.value = "全国の市町村"
+            sub_areas.set_nodes(registry.nodes("class20s"))
+        sub_area_title.update()
+
+    def select_office(office):
+        sub_area_title.value = f"{office.name}の市町村"
+        sub_areas.set_nodes(list(office.descendants("class20s")))
+        update_weather_display(office.name, office.code)
+
+    # 地方ごとに府県予報区のボタンを並べる（areas.jsonの階層から作成）
+    region_tiles = []
+    for center in registry.centers():
+        region_tiles.append(
+            ft.ExpansionTile(
+                title=ft.Text(center.name),
+                subtitle=ft.Text("、".join(office.name for office in center.children)),
+                controls=[
+                    ft.Row([
+                        ft.ElevatedButton(
+                            text=office.name,
+                            on_click=lambda e, office=office: select_office(office)
+                        )
+                        for office in center.children
+                    ], wrap=True),
+                ],
             )
         )
-    
-    if current_row:  # 残りのボタンを追加
-        rows.append(ft.Row(current_row, wrap=True))
 
     # メインコンテンツの配置
     title = ft.Text("天気予報", size=32, weight=ft.FontWeight.BOLD)
     subtitle = ft.Text("地域を選択してください", size=16)
-    
+
+    # 地方ごと・全国の今日の天気を並べて表示するダッシュボード
+    # （部品が多いので、初めて開いたときに作成する。開かないセッションは持たない）
+    dashboard_tab = ft.Tab(text="ダッシュボード", content=ft.Container())
+    dashboard_state = {"dashboard": None}
+
+    def handle_close(e):
+        # セッション終了時に購読をやめる
+        subscription.close()
+        if dashboard_state["dashboard"] is not None:
+            dashboard_state["dashboard"].stop()
+
+    page.on_close = handle_close
+
+    def handle_tab_change(e):
+        if e.control.selected_index != 1:
+            return
+        dashboard = dashboard_state["dashboard"]
+        if dashboard is None:
+            dashboard = dashboard_state["dashboard"] = Dashboard(registry, store)
+            dashboard.refresh()
+            dashboard.start()
+            dashboard_tab.content = dashboard.view
+            e.control.update()
+        else:
+            dashboard.refresh()
+
     page.add(
         title,
         subtitle,
-        *rows
+        ft.Tabs(
+            tabs=[
+                ft.Tab(
+                    text="地域を選択",
+                    content=ft.Row([
+                        ft.ListView(region_tiles, expand=3),
+                        ft.Column([
+                            ft.TextField(label="市町村を検索（名前・よみ）", on_change=search_sub_areas),
+                            sub_area_title,
+                            sub_areas.view,
+                        ], expand=2),
+                    ], expand=True, vertical_alignment=ft.CrossAxisAlignment.START),
+                ),
+                dashboard_tab,
+            ],
+            on_change=handle_tab_change,
+            expand=True,
+        ),
     )
 
 if __name__ == "__main__":
-    ft.app(target=main)
\ No newline at end of file
+    ft.app(target=main, assets_dir="assets")
\ No newline at end of file
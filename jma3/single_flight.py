@@ -0,0 +1,73 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlightStats:
+    """呼び出し回数と、実際に実行した回数（残りは他の呼び出しの結果を共有）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.max_waiters = 0
+
+    def record(self, executed: bool, waiters: int = 0):
+        with self._lock:
+            self.calls += 1
+            if executed:
+                self.executions += 1
+            self.max_waiters = max(self.max_waiters, waiters)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            shared = self.calls - self.executions
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "shared": shared,
+                "shared_ratio": shared / self.calls if self.calls else 0.0,
+                "max_waiters": self.max_waiters,
+            }
+
+
+class SingleFlight:
+    """同じキーの処理が実行中なら、新しく実行せずにその結果を待って共有する"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Future] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self.stats = SingleFlightStats()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """keyごとに同時に1回だけfnを実行し、待っていた呼び出しにも同じ結果（例外）を返す"""
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._flights[key] = future
+                self._waiters[key] = 0
+            else:
+                self._waiters[key] += 1
+                waiters = self._waiters[key]
+
+        if not leader:
+            self.stats.record(False, waiters)
+            return future.result()
+
+        self.stats.record(True)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            # 終わった処理は外す（以後の呼び出しは新しく実行する）
+            with self._lock:
+                del self._flights[key]
+                del self._waiters[key]
@@ -0,0 +1,73 @@
+from typing import Callable, Dict, List
+
+import flet as ft
+
+from area_registry import AreaNode
+
+
+class SubAreaList:
+    """市町村などの大量の地域を、見えている範囲だけ作成して表示するリスト"""
+    # 1行の高さ（全行同じ高さにしてスクロール位置から表示範囲を計算する）
+    ITEM_EXTENT = 48
+    # 画面外に余分に作成しておく行数（上下それぞれ）
+    BUFFER = 20
+    # 最初に表示する行数（スクロール位置が届く前の目安）
+    INITIAL_ROWS = 30
+
+    def __init__(self, on_select: Callable[[AreaNode], None]):
+        self.on_select = on_select
+        self._nodes: List[AreaNode] = []
+        self._start = 0
+        self._end = 0
+        self._items: Dict[int, ft.Control] = {}
+        self._top = ft.Container(height=0)
+        self._bottom = ft.Container(height=0)
+        self.view = ft.ListView(
+            controls=[self._top, self._bottom],
+            expand=True,
+            on_scroll=self._handle_scroll,
+            on_scroll_interval=50,
+        )
+
+    def set_nodes(self, nodes: List[AreaNode]):
+        """表示する地域を差し替えて先頭に戻る"""
+        self._nodes = nodes
+        self._items = {}
+        self._start = self._end = 0
+        self._show(0, min(len(nodes), self.INITIAL_ROWS + self.BUFFER))
+        if self.view.page:
+            self.view.scroll_to(offset=0)
+            self.view.update()
+
+    def _handle_scroll(self, e: ft.OnScrollEvent):
+        first = int(e.pixels // self.ITEM_EXTENT)
+        last = first + int(e.viewport_dimension // self.ITEM_EXTENT) + 1
+        # 見えている行が作成済みの範囲の端に近づいたときだけ作り直す
+        margin = self.BUFFER // 2
+        near_top = self._start > 0 and first < self._start + margin
+        near_bottom = self._end < len(self._nodes) and last > self._end - margin
+        if near_top or near_bottom:
+            self._show(max(first - self.BUFFER, 0), min(last + self.BUFFER, len(self._nodes)))
+            self.view.update()
+
+    def _show(self, start: int, end: int):
+        """start〜endの行だけを作成し、前後は同じ高さの余白で埋める"""
+        items = {i: self._items.get(i) or self._build_item(i) for i in range(start, end)}
+        self._items = items
+        self._start, self._end = start, end
+        self._top.height = start * self.ITEM_EXTENT
+        self._bottom.height = (len(self._nodes) - end) * self.ITEM_EXTENT
+        self.view.controls = [self._top, *(items[i] for i in range(start, end)), self._bottom]
+
+    def _build_item(self, index: int) -> ft.Control:
+        node = self._nodes[index]
+        office = node.ancestor("offices")
+        return ft.Container(
+            content=ft.ListTile(
+                title=ft.Text(node.name),
+                subtitle=ft.Text(office.name if office else "", size=12),
+                dense=True,
+                on_click=lambda e, node=node: self.on_select(node),
+            ),
+            height=self.ITEM_EXTENT,
+        )
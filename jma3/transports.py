@@ -0,0 +1,160 @@
+"""気象庁APIの取得方法の切り替え（本番のHTTP・保存済みファイル・ローカルのスタブサーバー・記録）
+
+指定方法（WeatherAPI.use_transport / --transport / 環境変数 JMA_TRANSPORT）:
+    live                 気象庁APIから取得（既定）
+    fixtures:DIR         DIR/{area_code}.json を返す（ネットワーク不要）
+    stub:DIR             DIR をローカルのHTTPサーバーで配信して取得
+    record:DIR           気象庁APIから取得し、DIR/{area_code}.json に保存
+"""
+import hashlib
+import json
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+import requests
+
+from http_client import HTTPClient
+
+BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast"
+
+
+class FixtureResponse:
+    """保存済みファイルから作るレスポンス（requests.Responseと同じ使い方の部分のみ）"""
+    __slots__ = ("status_code", "text", "headers", "url")
+
+    def __init__(self, status_code: int, text: str = "", headers: Optional[Dict[str, str]] = None, url: str = ""):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.url = url
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class HTTPTransport:
+    """HTTPで取得（既定は気象庁API。base_urlでスタブサーバーなどに向けられる）"""
+
+    def __init__(self, base_url: str = BASE_URL):
+        self.base_url = base_url.rstrip("/")
+
+    def get(self, area_code: str, headers: Optional[Dict[str, str]] = None):
+        return HTTPClient().get(f"{self.base_url}/{area_code}.json", headers=headers)
+
+    def __repr__(self) -> str:
+        return f"HTTPTransport({self.base_url})"
+
+
+class FixtureTransport:
+    """ディレクトリ内の {area_code}.json を返す（ETagは内容のハッシュなので条件付きGETも再現）"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def get(self, area_code: str, headers: Optional[Dict[str, str]] = None) -> FixtureResponse:
+        path = os.path.join(self.directory, f"{area_code}.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return FixtureResponse(404, url=path)
+
+        etag = f'"{hashlib.sha1(text.encode("utf-8")).hexdigest()}"'
+        if headers and headers.get("If-None-Match") == etag:
+            return FixtureResponse(304, headers={"ETag": etag}, url=path)
+        return FixtureResponse(200, text, {"ETag": etag}, url=path)
+
+    def __repr__(self) -> str:
+        return f"FixtureTransport({self.directory})"
+
+
+class RecordingTransport:
+    """別の取得方法で取得した200のレスポンスを {area_code}.json として保存"""
+
+    def __init__(self, directory: str, inner=None):
+        self.directory = directory
+        self.inner = inner or HTTPTransport()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, area_code: str, headers: Optional[Dict[str, str]] = None):
+        # 記録漏れが無いよう条件付きGETにはしない
+        response = self.inner.get(area_code)
+        if response.status_code == 200:
+            path = os.path.join(self.directory, f"{area_code}.json")
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(response.text)
+            os.replace(temp_path, path)
+        return response
+
+    def __repr__(self) -> str:
+        return f"RecordingTransport({self.directory}, {self.inner!r})"
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    # 気象庁APIと同じくKeep-Aliveで接続を使い回せるようにする
+    protocol_version = "HTTP/1.1"
+    # ヘッダーと本文を別々に送るため、Nagleアルゴリズムで応答が遅れないようにする
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """保存済みファイルのディレクトリをローカルのHTTPサーバーで配信（ポート0なら空きポート）"""
+
+    def __init__(self, directory: str, port: int = 0):
+        self.directory = directory
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), partial(_QuietHandler, directory=directory))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="stub-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def transport(self) -> HTTPTransport:
+        return HTTPTransport(self.base_url)
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def transport_from_spec(spec: Optional[str]):
+    """指定文字列（live / fixtures:DIR / stub:DIR / record:DIR）から取得方法を作成"""
+    kind, _, directory = (spec or "live").partition(":")
+    if kind == "live":
+        return HTTPTransport()
+    if not directory:
+        raise ValueError(f"ディレクトリを指定してください: {spec}")
+    if kind == "fixtures":
+        return FixtureTransport(directory)
+    if kind == "stub":
+        return StubServer(directory).start().transport()
+    if kind == "record":
+        return RecordingTransport(directory)
+    raise ValueError(f"不明な取得方法です: {spec}")
@@ -1,49 +1,56 @@
-import requests
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+import os
+from typing import Dict, Any, List, Optional, Union
+from forecast_cache import ForecastCache
+from forecast_parser import daily_forecasts, parse_forecast
+from forecast_records import ForecastBatch
+from transports import BASE_URL, transport_from_spec
 
 class WeatherAPI:
-    BASE_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast"
+    BASE_URL = BASE_URL
+    # 取得方法（環境変数JMA_TRANSPORTで切り替え。transports.pyを参照）
+    transport = transport_from_spec(os.environ.get("JMA_TRANSPORT"))
+
+    @classmethod
+    def use_transport(cls, transport):
+        """取得方法の切り替え（取得方法のオブジェクト、または transports.py の指定文字列）"""
+        if isinstance(transport, str):
+            transport = transport_from_spec(transport)
+        cls.transport = transport
 
     @staticmethod
-    def fetch_weather_data(area_code: str) -> Optional[Dict[str, Any]]:
-        """気象庁APIから天気データを取得"""
+    def fetch_weather_data(area_code: str) -> Optional[List[Dict[str, Any]]]:
+        """気象庁APIから天気データ（短期予報・週間予報）を取得"""
         try:
-            url = f"{WeatherAPI.BASE_URL}/{area_code}.json"
-            response = requests.get(url)
+            cache = ForecastCache()
+            entry = cache.get(area_code)
+            if entry is not None and entry.is_fresh():
+                return entry.data
+
+            # 期限切れの場合は条件付きGETで更新の有無を確認
+            response = WeatherAPI.transport.get(area_code, headers=entry.validators() if entry else None)
+            if response.status_code == 304 and entry is not None:
+                return cache.revalidated(area_code, entry).data
+
             response.raise_for_status()
-            return response.json()[0]
+            data = response.json()
+            cache.put(
+                area_code,
+                response.text,
+                data,
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+            )
+            return data
         except Exception as e:
             print(f"API取得エラー: {e}")
             return None
 
     @staticmethod
-    def process_weather_data(raw_data: Dict[str, Any], area_code: str, area_name: str) -> List[Dict[str, Any]]:
-        """APIから取得した天気データを処理"""
-        processed_data = []
-        time_series = raw_data['timeSeries']
-        
-        weather_codes = time_series[0]['areas'][0]['weatherCodes']
-        weathers = time_series[0]['areas'][0]['weathers']
-        temps = time_series[2]['areas'][0]['temps']
-        pops = time_series[1]['areas'][0]['pops'] if len(time_series) > 1 else []
+    def process_weather_batch(raw_data: Union[List[Dict[str, Any]], Dict[str, Any]], area_code: str, area_name: str) -> ForecastBatch:
+        """APIから取得した天気データを日ごとの予報に変換（日付はtimeDefinesから）"""
+        return daily_forecasts(parse_forecast(raw_data), area_code, area_name)
 
-        today = datetime.now()
-        
-        for i, (weather_code, weather) in enumerate(zip(weather_codes, weathers)):
-            forecast_date = today + timedelta(days=i)
-            
-            weather_data = {
-                'area_code': area_code,
-                'area_name': area_name,
-                'region_code': area_code[:2],
-                'forecast_date': forecast_date.strftime('%Y-%m-%d'),
-                'weather_code': weather_code,
-                'weather_description': weather,
-                'temperature_max': temps[i*2+1] if i*2+1 < len(temps) else None,
-                'temperature_min': temps[i*2] if i*2 < len(temps) else None,
-                'precipitation_probability': pops[i] if i < len(pops) else None
-            }
-            processed_data.append(weather_data)
-            
-        return processed_data
\ No newline at end of file
+    @staticmethod
+    def process_weather_data(raw_data: Union[List[Dict[str, Any]], Dict[str, Any]], area_code: str, area_name: str) -> List[Dict[str, Any]]:
+        """APIから取得した天気データを日ごとの予報（辞書のリスト）に変換"""
+        return WeatherAPI.process_weather_batch(raw_data, area_code, area_name).to_dicts()
@@ -1,203 +1,645 @@
+import os
 import sqlite3
 from datetime import datetime
 import threading
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+from forecast_records import ForecastBatch, ForecastData
+from icon_store import ICON_URL
 
 class WeatherDatabase:
     _instance = None
     _lock = threading.Lock()
 
+    # スキーマのバージョン（PRAGMA user_versionに記録）
+    SCHEMA_VERSION = 7
+    # 1接続あたりのページキャッシュ（KiB）
+    CACHE_SIZE_KB = 16 * 1024
+    # 表示用の読み込みに非正規化テーブル（forecast_snapshot）を使うか
+    USE_SNAPSHOT = True
+
     def __new__(cls):
         with cls._lock:
             if cls._instance is None:
-                cls._instance = super().__new__(cls)
+                instance = super().__new__(cls)
+                instance.db_name = "weather.db"
+                instance._local = threading.local()
+                instance._create_tables()
+                cls._instance = instance
         return cls._instance
 
-    def __init__(self):
-        self.db_name = "weather.db"
-        self._create_tables()
+    def _connect(self) -> sqlite3.Connection:
+        """スレッドごとの接続を取得（初回のみ作成・設定）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=30, cached_statements=256)
+            # 書き込み中でも他の接続から読めるようにWALモードを使用
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA cache_size = -{self.CACHE_SIZE_KB}")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """このスレッドの接続を閉じる"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
 
     def _create_tables(self):
-        """データベーステーブルの作成"""
-        with sqlite3.connect(self.db_name) as conn:
+        """データベーステーブルの作成（スキーマが古い場合のみ）"""
+        conn = self._connect()
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= self.SCHEMA_VERSION:
+            return
+
+        # 別プロセスと同時に起動しても一度だけ実行されるよう排他ロックを取る
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
             cursor = conn.cursor()
+            for target in range(version + 1, self.SCHEMA_VERSION + 1):
+                getattr(self, f"_schema_v{target}")(cursor)
+            cursor.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
-            # 地方マスターテーブル
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS regions (
-                region_code TEXT PRIMARY KEY,
-                region_name TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
+    def _schema_v1(self, cursor: sqlite3.Cursor):
+        """初期スキーマ"""
+        # 地方マスターテーブル
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS regions (
+            region_code TEXT PRIMARY KEY,
+            region_name TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
 
-            # 地域マスターテーブル
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS areas (
-                area_code TEXT PRIMARY KEY,
-                area_name TEXT NOT NULL,
-                region_code TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (region_code) REFERENCES regions (region_code)
-            )
-            ''')
+        # 地域マスターテーブル
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS areas (
+            area_code TEXT PRIMARY KEY,
+            area_name TEXT NOT NULL,
+            region_code TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (region_code) REFERENCES regions (region_code)
+        )
+        ''')
 
-            # 天気種別マスターテーブル
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS weather_types (
-                weather_code TEXT PRIMARY KEY,
-                weather_description TEXT NOT NULL,
-                icon_path TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
+        # 天気種別マスターテーブル
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weather_types (
+            weather_code TEXT PRIMARY KEY,
+            weather_description TEXT NOT NULL,
+            icon_path TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
 
-            # 天気予報テーブル
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS weather_forecasts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                area_code TEXT,
-                forecast_date DATE,
-                weather_code TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (area_code) REFERENCES areas (area_code),
-                FOREIGN KEY (weather_code) REFERENCES weather_types (weather_code),
-                UNIQUE (area_code, forecast_date)
-            )
-            ''')
+        # 天気予報テーブル
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS weather_forecasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            area_code TEXT,
+            forecast_date DATE,
+            weather_code TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (area_code) REFERENCES areas (area_code),
+            FOREIGN KEY (weather_code) REFERENCES weather_types (weather_code),
+            UNIQUE (area_code, forecast_date)
+        )
+        ''')
 
-            # 気温テーブル
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS temperatures (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                forecast_id INTEGER,
-                temperature_type TEXT CHECK (temperature_type IN ('max', 'min')),
-                temperature INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (forecast_id) REFERENCES weather_forecasts (id)
-            )
-            ''')
+        # 気温テーブル
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS temperatures (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            forecast_id INTEGER,
+            temperature_type TEXT CHECK (temperature_type IN ('max', 'min')),
+            temperature INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (forecast_id) REFERENCES weather_forecasts (id)
+        )
+        ''')
 
-            # 降水確率テーブル
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS precipitation_probabilities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                forecast_id INTEGER,
-                probability INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (forecast_id) REFERENCES weather_forecasts (id)
-            )
+        # 降水確率テーブル
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS precipitation_probabilities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            forecast_id INTEGER,
+            probability INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (forecast_id) REFERENCES weather_forecasts (id)
+        )
+        ''')
+
+        # APIレスポンスのキャッシュテーブル
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS api_cache (
+            area_code TEXT PRIMARY KEY,
+            body TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            report_datetime TEXT,
+            expires_at REAL NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+
+    def _schema_v2(self, cursor: sqlite3.Cursor):
+        """気温・降水確率を予報ごとに1行へ（INSERT OR REPLACEで溜まった行を整理）"""
+        self._remove_stale_children(cursor)
+        cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_temperatures_forecast_type
+        ON temperatures (forecast_id, temperature_type)
+        ''')
+        cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_precipitation_probabilities_forecast
+        ON precipitation_probabilities (forecast_id)
+        ''')
+
+    def _schema_v3(self, cursor: sqlite3.Cursor):
+        """予報取得クエリ用のカバリングインデックス（子テーブルはv2の一意インデックスを使用）"""
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_weather_forecasts_area_date
+        ON weather_forecasts (area_code, forecast_date, weather_code, updated_at)
+        ''')
+
+    def _schema_v4(self, cursor: sqlite3.Cursor):
+        """表示用の非正規化テーブル（地域・日付ごとに1行）"""
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS forecast_snapshot (
+            area_code TEXT NOT NULL,
+            forecast_date DATE NOT NULL,
+            area_name TEXT,
+            weather_code TEXT,
+            weather_description TEXT,
+            icon_path TEXT,
+            temperature_max INTEGER,
+            temperature_min INTEGER,
+            precipitation_probability INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (area_code, forecast_date)
+        ) WITHOUT ROWID
+        ''')
+        # 既存の予報から作成
+        cursor.execute('''
+        INSERT OR REPLACE INTO forecast_snapshot (
+            area_name, forecast_date, weather_description, icon_path,
+            temperature_max, temperature_min, precipitation_probability,
+            updated_at, weather_code, area_code
+        )
+        ''' + self.FORECAST_QUERY)
+
+    def _schema_v5(self, cursor: sqlite3.Cursor):
+        """定時取得（ingest.py）の実行結果"""
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingest_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at TEXT NOT NULL,
+            areas INTEGER,
+            succeeded INTEGER,
+            failed TEXT,
+            records INTEGER,
+            batches INTEGER,
+            retries INTEGER,
+            fetch_seconds REAL,
+            save_seconds REAL,
+            total_seconds REAL
+        )
+        ''')
+
+    def _schema_v6(self, cursor: sqlite3.Cursor):
+        """（廃止）アイコンのパスをローカルのファイルに変更していた。保存していないアイコンも指すためv7で戻す"""
+
+    def _schema_v7(self, cursor: sqlite3.Cursor):
+        """アイコンのパスを気象庁のURLに戻す（ローカルのファイルがあるかは表示時にicon_srcで判断）"""
+        for table in ('weather_types', 'forecast_snapshot'):
+            cursor.execute(f'''
+            UPDATE {table} SET icon_path = ? || '/' || weather_code || '.svg'
+            WHERE icon_path LIKE '/icons/%'
+            ''', (ICON_URL,))
+
+    def _remove_stale_children(self, cursor: sqlite3.Cursor):
+        """親の予報が無い行・重複した行の削除（重複は最後に保存した行を残す）"""
+        for table in ('temperatures', 'precipitation_probabilities'):
+            cursor.execute(f'''
+            DELETE FROM {table}
+            WHERE forecast_id IS NULL
+               OR forecast_id NOT IN (SELECT id FROM weather_forecasts)
             ''')
+        cursor.execute('''
+        DELETE FROM temperatures WHERE id NOT IN (
+            SELECT MAX(id) FROM temperatures GROUP BY forecast_id, temperature_type
+        )
+        ''')
+        cursor.execute('''
+        DELETE FROM precipitation_probabilities WHERE id NOT IN (
+            SELECT MAX(id) FROM precipitation_probabilities GROUP BY forecast_id
+        )
+        ''')
 
-            conn.commit()
+    def compact(self) -> Dict[str, int]:
+        """不要な行を削除してデータベースファイルを縮小"""
+        conn = self._connect()
+        size_before = os.path.getsize(self.db_name)
+        changes_before = conn.total_changes
+        with conn:
+            self._remove_stale_children(conn.cursor())
+        removed = conn.total_changes - changes_before
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return {
+            'removed_rows': removed,
+            'size_before': size_before,
+            'size_after': os.path.getsize(self.db_name),
+        }
+
+    @staticmethod
+    def icon_path(weather_code: str) -> str:
+        """天気コードに対応するアイコンのURL（表示時はicon_srcで保存済みのファイルを優先）"""
+        return f"{ICON_URL}/{weather_code}.svg"
 
     def save_weather_data(self, weather_data: Dict[str, Any]) -> bool:
         """天気データの保存"""
-        with sqlite3.connect(self.db_name) as conn:
+        return self.save_weather_batch([weather_data])
+
+    def save_weather_batch(self, weather_data: ForecastData) -> bool:
+        """複数日・複数地域の天気データを1トランザクションでまとめて保存（ForecastBatchは変換せずに使う）"""
+        batch = ForecastBatch.of(weather_data)
+        if not len(batch):
+            return True
+
+        with self._connect() as conn:
             cursor = conn.cursor()
             try:
-                # 地域情報の保存/更新
-                cursor.execute('''
-                INSERT OR REPLACE INTO areas (area_code, area_name, region_code)
+                # 地域・天気種別は内容が変わったときだけ更新
+                areas = {row[0]: row for row in batch.rows('area_code', 'area_name', 'region_code')}
+                cursor.executemany('''
+                INSERT INTO areas (area_code, area_name, region_code)
                 VALUES (?, ?, ?)
-                ''', (
-                    weather_data['area_code'],
-                    weather_data['area_name'],
-                    weather_data['region_code']
-                ))
+                ON CONFLICT (area_code) DO UPDATE SET
+                    area_name = excluded.area_name,
+                    region_code = excluded.region_code,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE areas.area_name IS NOT excluded.area_name
+                   OR areas.region_code IS NOT excluded.region_code
+                ''', areas.values())
 
-                # 天気種別の保存/更新
-                cursor.execute('''
-                INSERT OR REPLACE INTO weather_types (weather_code, weather_description, icon_path)
+                weather_types = dict(batch.rows('weather_code', 'weather_description'))
+                cursor.executemany('''
+                INSERT INTO weather_types (weather_code, weather_description, icon_path)
                 VALUES (?, ?, ?)
-                ''', (
-                    weather_data['weather_code'],
-                    weather_data['weather_description'],
-                    f"https://www.jma.go.jp/bosai/forecast/img/{weather_data['weather_code']}.svg"
-                ))
+                ON CONFLICT (weather_code) DO UPDATE SET
+                    weather_description = excluded.weather_description,
+                    icon_path = excluded.icon_path,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE weather_types.weather_description IS NOT excluded.weather_description
+                   OR weather_types.icon_path IS NOT excluded.icon_path
+                ''', [
+                    (code, description, self.icon_path(code))
+                    for code, description in weather_types.items()
+                ])
 
-                # 天気予報の保存
-                cursor.execute('''
-                INSERT OR REPLACE INTO weather_forecasts (area_code, forecast_date, weather_code)
+                # 天気予報の保存（既存の行はidを変えずに更新）
+                cursor.executemany('''
+                INSERT INTO weather_forecasts (area_code, forecast_date, weather_code)
                 VALUES (?, ?, ?)
-                ''', (
-                    weather_data['area_code'],
-                    weather_data['forecast_date'],
-                    weather_data['weather_code']
-                ))
+                ON CONFLICT (area_code, forecast_date) DO UPDATE SET
+                    weather_code = excluded.weather_code,
+                    updated_at = CURRENT_TIMESTAMP
+                ''', batch.rows('area_code', 'forecast_date', 'weather_code'))
 
-                forecast_id = cursor.lastrowid
+                # 保存した予報のidをまとめて取得（過去の日付の行は読まないよう、この一括分の日付の範囲に限定）
+                placeholders = ", ".join("?" * len(areas))
+                cursor.execute(f'''
+                SELECT area_code, forecast_date, id FROM weather_forecasts
+                WHERE area_code IN ({placeholders}) AND forecast_date BETWEEN ? AND ?
+                ''', (*areas, min(batch.forecast_date), max(batch.forecast_date)))
+                forecast_ids = {(row[0], row[1]): row[2] for row in cursor.fetchall()}
+                ids = [forecast_ids[key] for key in batch.rows('area_code', 'forecast_date')]
 
-                # 気温の保存
-                if weather_data.get('temperature_max'):
-                    cursor.execute('''
-                    INSERT INTO temperatures (forecast_id, temperature_type, temperature)
-                    VALUES (?, 'max', ?)
-                    ''', (forecast_id, weather_data['temperature_max']))
+                temperatures = []
+                missing_temperatures = []
+                for temperature_type, values in (('max', batch.temperature_max), ('min', batch.temperature_min)):
+                    for forecast_id, value in zip(ids, values):
+                        if value is not None:
+                            temperatures.append((forecast_id, temperature_type, value))
+                        else:
+                            missing_temperatures.append((forecast_id, temperature_type))
+                probabilities = [
+                    (forecast_id, value)
+                    for forecast_id, value in zip(ids, batch.precipitation_probability)
+                    if value is not None
+                ]
+                missing_probabilities = [
+                    (forecast_id,)
+                    for forecast_id, value in zip(ids, batch.precipitation_probability)
+                    if value is None
+                ]
 
-                if weather_data.get('temperature_min'):
-                    cursor.execute('''
-                    INSERT INTO temperatures (forecast_id, temperature_type, temperature)
-                    VALUES (?, 'min', ?)
-                    ''', (forecast_id, weather_data['temperature_min']))
+                # 気温・降水確率は予報ごとに1行だけ持ち、値を置き換える
+                cursor.executemany('''
+                INSERT INTO temperatures (forecast_id, temperature_type, temperature)
+                VALUES (?, ?, ?)
+                ON CONFLICT (forecast_id, temperature_type) DO UPDATE SET
+                    temperature = excluded.temperature
+                ''', temperatures)
+                cursor.executemany('''
+                DELETE FROM temperatures WHERE forecast_id = ? AND temperature_type = ?
+                ''', missing_temperatures)
+                cursor.executemany('''
+                INSERT INTO precipitation_probabilities (forecast_id, probability)
+                VALUES (?, ?)
+                ON CONFLICT (forecast_id) DO UPDATE SET
+                    probability = excluded.probability
+                ''', probabilities)
+                cursor.executemany('''
+                DELETE FROM precipitation_probabilities WHERE forecast_id = ?
+                ''', missing_probabilities)
 
-                # 降水確率の保存
-                if weather_data.get('precipitation_probability'):
-                    cursor.execute('''
-                    INSERT INTO precipitation_probabilities (forecast_id, probability)
-                    VALUES (?, ?)
-                    ''', (forecast_id, weather_data['precipitation_probability']))
+                # 表示用テーブルも同じトランザクションで更新
+                cursor.executemany('''
+                INSERT INTO forecast_snapshot (
+                    area_code, forecast_date, area_name, weather_code, weather_description,
+                    icon_path, temperature_max, temperature_min, precipitation_probability
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (area_code, forecast_date) DO UPDATE SET
+                    area_name = excluded.area_name,
+                    weather_code = excluded.weather_code,
+                    weather_description = excluded.weather_description,
+                    icon_path = excluded.icon_path,
+                    temperature_max = excluded.temperature_max,
+                    temperature_min = excluded.temperature_min,
+                    precipitation_probability = excluded.precipitation_probability,
+                    updated_at = CURRENT_TIMESTAMP
+                ''', zip(
+                    batch.area_code,
+                    batch.forecast_date,
+                    batch.area_name,
+                    batch.weather_code,
+                    batch.weather_description,
+                    map(self.icon_path, batch.weather_code),
+                    batch.temperature_max,
+                    batch.temperature_min,
+                    batch.precipitation_probability
+                ))
 
                 conn.commit()
                 return True
 
             except Exception as e:
-                print(f"データベース保存エラー: {e}")
+                print(f"データベース一括保存エラー: {e}")
                 conn.rollback()
                 return False
 
+    # 表示用の天気予報を組み立てるSELECT（WHERE句は呼び出し側で追加）
+    FORECAST_QUERY = """
+    SELECT
+        a.area_name,
+        wf.forecast_date,
+        wt.weather_description,
+        wt.icon_path,
+        t_max.temperature as max_temp,
+        t_min.temperature as min_temp,
+        pp.probability as rain_probability,
+        wf.updated_at,
+        wf.weather_code,
+        wf.area_code
+    FROM weather_forecasts wf
+    JOIN areas a ON wf.area_code = a.area_code
+    JOIN weather_types wt ON wf.weather_code = wt.weather_code
+    LEFT JOIN temperatures t_max ON wf.id = t_max.forecast_id
+        AND t_max.temperature_type = 'max'
+    LEFT JOIN temperatures t_min ON wf.id = t_min.forecast_id
+        AND t_min.temperature_type = 'min'
+    LEFT JOIN precipitation_probabilities pp ON wf.id = pp.forecast_id
+    """
+
+    # 非正規化テーブルから同じ列順で取得するSELECT
+    SNAPSHOT_QUERY = """
+    SELECT
+        wf.area_name,
+        wf.forecast_date,
+        wf.weather_description,
+        wf.icon_path,
+        wf.temperature_max,
+        wf.temperature_min,
+        wf.precipitation_probability,
+        wf.updated_at,
+        wf.weather_code,
+        wf.area_code
+    FROM forecast_snapshot wf
+    """
+
+    def _read_query(self) -> str:
+        return self.SNAPSHOT_QUERY if self.USE_SNAPSHOT else self.FORECAST_QUERY
+
+    @staticmethod
+    def _forecast_from_row(result: tuple) -> Dict[str, Any]:
+        return {
+            'area_name': result[0],
+            'forecast_date': result[1],
+            'weather_description': result[2],
+            'icon_path': result[3],
+            'temperature_max': result[4],
+            'temperature_min': result[5],
+            'precipitation_probability': result[6],
+            'updated_at': result[7],
+            'weather_code': result[8],
+            'area_code': result[9]
+        }
+
     def get_weather_forecast(self, area_code: str, date: str) -> Dict[str, Any]:
         """天気予報データの取得"""
-        with sqlite3.connect(self.db_name) as conn:
+        with self._connect() as conn:
             cursor = conn.cursor()
-            
-            query = """
-            SELECT 
-                a.area_name,
-                wf.forecast_date,
-                wt.weather_description,
-                wt.icon_path,
-                t_max.temperature as max_temp,
-                t_min.temperature as min_temp,
-                pp.probability as rain_probability,
-                wf.updated_at
-            FROM weather_forecasts wf
-            JOIN areas a ON wf.area_code = a.area_code
-            JOIN weather_types wt ON wf.weather_code = wt.weather_code
-            LEFT JOIN temperatures t_max ON wf.id = t_max.forecast_id 
-                AND t_max.temperature_type = 'max'
-            LEFT JOIN temperatures t_min ON wf.id = t_min.forecast_id 
-                AND t_min.temperature_type = 'min'
-            LEFT JOIN precipitation_probabilities pp ON wf.id = pp.forecast_id
-            WHERE wf.area_code = ? AND wf.forecast_date = ?
-            """
-            
-            cursor.execute(query, (area_code, date))
+            cursor.execute(
+                self._read_query() + "WHERE wf.area_code = ? AND wf.forecast_date = ?",
+                (area_code, date)
+            )
             result = cursor.fetchone()
-            
+
+            if result:
+                return self._forecast_from_row(result)
+            return None
+
+    def get_forecast_range(self, area_codes: List[str], start: str, end: str) -> Dict[str, List[Dict[str, Any]]]:
+        """複数地域・複数日（start〜end）の天気予報を1回のクエリで取得"""
+        forecasts = {area_code: [] for area_code in area_codes}
+        if not area_codes:
+            return forecasts
+
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            placeholders = ", ".join("?" * len(area_codes))
+            cursor.execute(
+                self._read_query()
+                + f"WHERE wf.area_code IN ({placeholders}) AND wf.forecast_date BETWEEN ? AND ? "
+                + "ORDER BY wf.area_code, wf.forecast_date",
+                (*area_codes, start, end)
+            )
+            for result in cursor.fetchall():
+                forecasts[result[9]].append(self._forecast_from_row(result))
+        return forecasts
+
+    def find_full_scans(self) -> List[str]:
+        """予報取得クエリの実行計画から全件走査（SCAN）を探す"""
+        queries = []
+        for base in (self.FORECAST_QUERY, self.SNAPSHOT_QUERY):
+            queries.append((
+                base + "WHERE wf.area_code = ? AND wf.forecast_date = ?",
+                ("130000", "2026-01-01")
+            ))
+            queries.append((
+                base
+                + "WHERE wf.area_code IN (?, ?) AND wf.forecast_date BETWEEN ? AND ? "
+                + "ORDER BY wf.area_code, wf.forecast_date",
+                ("130000", "270000", "2026-01-01", "2026-01-03")
+            ))
+        scans = []
+        with self._connect() as conn:
+            for query, params in queries:
+                for row in conn.execute("EXPLAIN QUERY PLAN " + query, params):
+                    detail = row[3]
+                    if detail.startswith("SCAN") or "USE TEMP B-TREE" in detail:
+                        scans.append(detail)
+        return scans
+
+    def get_api_cache(self, area_code: str) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みAPIレスポンスの取得"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT body, etag, last_modified, report_datetime, expires_at
+            FROM api_cache WHERE area_code = ?
+            """, (area_code,))
+            result = cursor.fetchone()
+
             if result:
                 return {
-                    'area_name': result[0],
-                    'forecast_date': result[1],
-                    'weather_description': result[2],
-                    'icon_path': result[3],
-                    'temperature_max': result[4],
-                    'temperature_min': result[5],
-                    'precipitation_probability': result[6],
-                    'updated_at': result[7]
+                    'body': result[0],
+                    'etag': result[1],
+                    'last_modified': result[2],
+                    'report_datetime': result[3],
+                    'expires_at': result[4]
                 }
-            return None
\ No newline at end of file
+            return None
+
+    def save_api_cache(self, area_code: str, body: Optional[str], etag: Optional[str],
+                       last_modified: Optional[str], report_datetime: Optional[str],
+                       expires_at: float) -> bool:
+        """APIレスポンスのキャッシュ保存（bodyがNoneなら有効期限のみ更新）"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            try:
+                if body is None:
+                    cursor.execute("""
+                    UPDATE api_cache SET expires_at = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE area_code = ?
+                    """, (expires_at, area_code))
+                else:
+                    cursor.execute("""
+                    INSERT OR REPLACE INTO api_cache
+                        (area_code, body, etag, last_modified, report_datetime, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """, (area_code, body, etag, last_modified, report_datetime, expires_at))
+                conn.commit()
+                return True
+
+            except Exception as e:
+                print(f"キャッシュ保存エラー: {e}")
+                conn.rollback()
+                return False
+
+    def get_weather_codes(self) -> List[str]:
+        """保存済みの天気コード"""
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT weather_code FROM weather_types")]
+
+    def clear_api_cache(self):
+        """キャッシュ済みAPIレスポンスの全削除"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM api_cache")
+
+    def save_ingest_run(self, stats: Dict[str, Any]) -> bool:
+        """定時取得1回分の結果を記録"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                INSERT INTO ingest_runs (
+                    started_at, areas, succeeded, failed, records, batches, retries,
+                    fetch_seconds, save_seconds, total_seconds
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    stats['started_at'],
+                    stats['areas'],
+                    stats['succeeded'],
+                    ",".join(stats['failed']),
+                    stats['records'],
+                    stats['batches'],
+                    stats['retries'],
+                    stats['fetch_seconds'],
+                    stats['save_seconds'],
+                    stats['total_seconds']
+                ))
+                conn.commit()
+                return True
+
+            except Exception as e:
+                print(f"実行結果の保存エラー: {e}")
+                conn.rollback()
+                return False
+
+    def get_ingest_runs(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """直近の定時取得の結果（新しい順）"""
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+            SELECT started_at, areas, succeeded, failed, records, batches, retries,
+                   fetch_seconds, save_seconds, total_seconds
+            FROM ingest_runs ORDER BY id DESC LIMIT ?
+            """, (limit,))
+            return [
+                {
+                    'started_at': result[0],
+                    'areas': result[1],
+                    'succeeded': result[2],
+                    'failed': result[3].split(",") if result[3] else [],
+                    'records': result[4],
+                    'batches': result[5],
+                    'retries': result[6],
+                    'fetch_seconds': result[7],
+                    'save_seconds': result[8],
+                    'total_seconds': result[9]
+                }
+                for result in cursor.fetchall()
+            ]
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ["check-plan"]:
+        scans = WeatherDatabase().find_full_scans()
+        for detail in scans:
+            print(f"全件走査: {detail}")
+        print("問題なし" if not scans else f"{len(scans)}件の全件走査があります")
+        sys.exit(1 if scans else 0)
+    elif sys.argv[1:] == ["compact"]:
+        result = WeatherDatabase().compact()
+        print(
+            f"整理完了: {result['removed_rows']}行削除 /"
+            f" {result['size_before']:,} bytes → {result['size_after']:,} bytes"
+        )
+    else:
+        print("使い方: python weather_database.py [compact | check-plan]")